@@ -0,0 +1,26 @@
+# Whole-melody synthesis.
+# A track is built in one preallocated pass, one slice per note. The game
+# streams its music through music_stream.NoteStream instead, which renders
+# the same waveform a chunk at a time; this whole-track version is kept as
+# the reference it matches and for the benchmarks.
+import numpy as np
+
+SAMPLE_RATE = 44100
+
+def synthesize_melody(notes, harmonic=0.0, volume=0.5, sample_rate=SAMPLE_RATE):
+    # Notes are (frequency, duration) pairs. The whole track is allocated
+    # up front and each note is written into its own slice.
+    lengths = [int(sample_rate * duration) for _, duration in notes]
+    audio_data = np.empty(sum(lengths), dtype=np.int16)
+
+    start = 0
+    for (frequency, _), length in zip(notes, lengths):
+        t = np.arange(length) / sample_rate
+        note = np.sin(frequency * t * 2 * np.pi)
+        if harmonic:
+            # Add harmonics for a richer tone
+            note += np.sin(2 * frequency * t * 2 * np.pi) * harmonic
+        audio_data[start:start + length] = note * 32767 * volume
+        start += length
+
+    return audio_data
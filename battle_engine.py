@@ -0,0 +1,370 @@
+# Battle rules for Sun Voyage, without any pygame dependency.
+# sv001.py builds its drawable Player/Enemy/BattleSystem on top of these
+# classes, and battle_sim.py mirrors the same rules on NumPy arrays.
+import collections
+import functools
+
+import random_streams
+
+# Enemy archetypes. An enemy's type id is its index in this list. The
+# multipliers scale the level's base health/power/defense, "special" is the
+# special attack's damage range as multiples of power and "special_message"
+# its battle log line.
+ENEMY_TYPES = [
+    {"name": "Planet", "color": (0, 0, 255), "radius": 40},
+    {"name": "Comet", "color": (255, 255, 255), "radius": 30},
+    {"name": "Black Hole", "color": (128, 0, 128), "radius": 35,
+     "power": 1.5, "defense": 0.7, "special": (1.5, 2.0),
+     "special_message": "The Black Hole generates gravitational forces for {damage} damage!"},
+    {"name": "Meteor", "color": (255, 165, 0), "radius": 25},
+    {"name": "Nebula", "color": (138, 43, 226), "radius": 45},
+    {"name": "Neutron Star", "color": (0, 191, 255), "radius": 30,
+     "power": 1.2, "health": 1.2},
+    {"name": "Supernova", "color": (255, 69, 0), "radius": 50,
+     "power": 2, "health": 0.8, "defense": 0.5, "special": (1.8, 2.2),
+     "special_message": "The Supernova explodes with energy for {damage} damage!"},
+    {"name": "Asteroid", "color": (169, 169, 169), "radius": 35}
+]
+ENEMY_NAMES = [enemy_type["name"] for enemy_type in ENEMY_TYPES]
+
+# Stats of one enemy type at one level; attack and special are inclusive
+# (low, high) damage ranges
+EnemyStats = collections.namedtuple(
+    "EnemyStats", "max_health power defense exp_reward attack special heal")
+
+# Player actions, in menu order
+MENU_ITEMS = ["Blast", "Forcefield", "Fission", "Fusion"]
+
+# Number of victories needed to finish the game
+VICTORIES_TO_WIN = 10
+
+# Player class
+class Player:
+    __slots__ = ("name", "rng", "max_health", "health", "power", "defense", "level",
+                 "experience", "exp_to_next_level", "victories")
+
+    def __init__(self, name="Sun", rng=None):
+        self.name = name
+        self.rng = rng if rng is not None else random_streams.python_stream("battle")
+        self.max_health = 100
+        self.health = 100
+        self.power = 20
+        self.defense = 10
+        self.level = 1
+        self.experience = 0
+        self.exp_to_next_level = 100
+        self.victories = 0
+
+    def attack(self):
+        return self.rng.randint(int(self.power * 0.8), int(self.power * 1.2))
+
+    def defend(self):
+        return self.defense * 2
+
+    def fission(self):
+        # Powerful attack that costs health
+        cost = int(self.max_health * 0.1)
+        self.health = max(1, self.health - cost)
+        return self.rng.randint(int(self.power * 1.5), int(self.power * 2.0))
+
+    def fusion(self):
+        # Heal self
+        heal_amount = int(self.max_health * 0.3)
+        self.health = min(self.max_health, self.health + heal_amount)
+        return heal_amount
+
+    def gain_experience(self, amount):
+        self.experience += amount
+        if self.experience >= self.exp_to_next_level:
+            self.level_up()
+
+    def level_up(self):
+        self.level += 1
+        self.experience -= self.exp_to_next_level
+        self.exp_to_next_level = int(self.exp_to_next_level * 1.5)
+        self.max_health += 20
+        self.health = self.max_health
+        self.power += 5
+        self.defense += 3
+        return True
+
+@functools.lru_cache(maxsize=None)
+def enemy_stat_table(level):
+    # EnemyStats for every type id at this level, computed once per level.
+    # Type multipliers are applied to the integer base stats and truncated,
+    # so all stats stay integers.
+    level_factor = 0.8 + (level * 0.2)
+    table = []
+    for enemy_type in ENEMY_TYPES:
+        max_health = int(int(80 * level_factor) * enemy_type.get("health", 1))
+        power = int(int(15 * level_factor) * enemy_type.get("power", 1))
+        defense = int(int(8 * level_factor) * enemy_type.get("defense", 1))
+        special_low, special_high = enemy_type.get("special", (1.3, 1.7))
+        table.append(EnemyStats(
+            max_health, power, defense, int(50 * level_factor),
+            (int(power * 0.8), int(power * 1.2)),
+            (int(power * special_low), int(power * special_high)),
+            int(max_health * 0.2),
+        ))
+    return tuple(table)
+
+# Enemy class
+class Enemy:
+    __slots__ = ("rng", "level", "type_id", "stats", "health")
+
+    def __init__(self, level, rng=None, type_id=None):
+        self.rng = rng if rng is not None else random_streams.python_stream("battle")
+        if type_id is None:
+            type_id = self.rng.randrange(len(ENEMY_TYPES))
+        self.reset(level, type_id)
+
+    def reset(self, level, type_id):
+        # Become a fresh enemy of this type; stats scale with player level
+        self.level = level
+        self.type_id = type_id
+        self.stats = enemy_stat_table(level)[type_id]
+        self.health = self.stats.max_health
+
+    # Fixed stats come straight from the stat table, the same numbers the
+    # attack, special and heal rolls use
+    @property
+    def max_health(self):
+        return self.stats.max_health
+
+    @property
+    def power(self):
+        return self.stats.power
+
+    @property
+    def defense(self):
+        return self.stats.defense
+
+    @property
+    def exp_reward(self):
+        return self.stats.exp_reward
+
+    @property
+    def type(self):
+        return ENEMY_TYPES[self.type_id]
+
+    @property
+    def name(self):
+        return ENEMY_NAMES[self.type_id]
+
+    @property
+    def color(self):
+        return ENEMY_TYPES[self.type_id]["color"]
+
+    @property
+    def radius(self):
+        return ENEMY_TYPES[self.type_id]["radius"]
+
+    def choose_action(self):
+        # AI for enemy actions
+        if self.health < self.max_health * 0.3:
+            # Low health, 50% chance to heal
+            if self.rng.random() < 0.5:
+                return "heal"
+
+        if self.health < self.max_health * 0.5:
+            # Medium health, 30% chance to defend, 10% chance to heal
+            rand = self.rng.random()
+            if rand < 0.3:
+                return "defend"
+            elif rand < 0.4:
+                return "heal"
+
+        # Otherwise mostly attack, sometimes use special
+        if self.rng.random() < 0.7:
+            return "attack"
+        else:
+            return "special"
+
+    def attack(self):
+        return self.rng.randint(*self.stats.attack)
+
+    def defend(self):
+        return self.defense * 2
+
+    def special(self):
+        # Special attack, with a damage range that depends on the type
+        return self.rng.randint(*self.stats.special)
+
+    def heal(self):
+        heal_amount = self.stats.heal
+        self.health = min(self.max_health, self.health + heal_amount)
+        return heal_amount
+
+# Everything needed to put a battle back the way it was: both combatants,
+# the battle state and turn counter, and optionally the RNG state. One
+# snapshot can be captured into again and again, and restoring reuses the
+# battle's Player and Enemy objects, so cloning states for lookahead or
+# rollback allocates nothing but the RNG state tuple.
+class BattleSnapshot:
+    __slots__ = ("player_health", "player_max_health", "player_power", "player_defense", "player_level",
+                 "player_experience", "player_exp_to_next_level", "player_victories",
+                 "enemy_type", "enemy_level", "enemy_health",
+                 "state", "turn", "message", "last_action", "rng_state")
+
+    def capture(self, battle, rng=True):
+        player = battle.player
+        self.player_health = player.health
+        self.player_max_health = player.max_health
+        self.player_power = player.power
+        self.player_defense = player.defense
+        self.player_level = player.level
+        self.player_experience = player.experience
+        self.player_exp_to_next_level = player.exp_to_next_level
+        self.player_victories = player.victories
+
+        enemy = battle.enemy
+        if enemy is None:
+            self.enemy_type = -1
+        else:
+            self.enemy_type = enemy.type_id
+            self.enemy_level = enemy.level
+            self.enemy_health = enemy.health
+
+        self.state = battle.state
+        self.turn = battle.turn
+        self.message = battle.message
+        self.last_action = battle.last_action
+        self.rng_state = battle.rng.getstate() if rng else None
+        return self
+
+    def restore(self, battle):
+        player = battle.player
+        player.health = self.player_health
+        player.max_health = self.player_max_health
+        player.power = self.player_power
+        player.defense = self.player_defense
+        player.level = self.player_level
+        player.experience = self.player_experience
+        player.exp_to_next_level = self.player_exp_to_next_level
+        player.victories = self.player_victories
+
+        if self.enemy_type < 0:
+            battle.enemy = None
+        else:
+            enemy = battle.enemy
+            if enemy is None:
+                enemy = battle.enemy = battle.enemy_class(self.enemy_level, battle.rng, self.enemy_type)
+            elif enemy.type_id != self.enemy_type or enemy.level != self.enemy_level:
+                enemy.reset(self.enemy_level, self.enemy_type)
+            enemy.health = self.enemy_health
+
+        battle.state = self.state
+        battle.turn = self.turn
+        battle.message = self.message
+        battle.last_action = self.last_action
+        if self.rng_state is not None:
+            battle.rng.setstate(self.rng_state)
+
+# Turn logic of a battle. State changes happen immediately; pacing, sounds
+# and effects are left to the caller, which can look at last_action to see
+# what just happened ("blast", "forcefield", ... or "attack", "defend", ...).
+class Battle:
+    enemy_class = Enemy
+
+    def __init__(self, player, rng=None):
+        self.player = player
+        self.rng = rng if rng is not None else player.rng
+        self.enemy = None
+        self.state = "player_turn"  # "player_turn", "enemy_turn", "win", "lose"
+        self.turn = 0  # player turns taken in this battle
+        self.message = ""
+        self.last_action = None
+        self.menu_items = list(MENU_ITEMS)
+
+    def new_battle(self):
+        self.enemy = self.enemy_class(self.player.level, self.rng)
+        self.state = "player_turn"
+        self.turn = 0
+        self.message = f"A {self.enemy.name} appears in space!"
+        self.last_action = None
+
+    def snapshot(self, into=None, rng=True):
+        # Capture the battle into a BattleSnapshot (a new one, or `into`)
+        if into is None:
+            into = BattleSnapshot()
+        return into.capture(self, rng)
+
+    def restore(self, snapshot):
+        snapshot.restore(self)
+
+    def player_action(self, action):
+        if self.state != "player_turn":
+            return
+
+        if action == "Blast":
+            damage = self.player.attack()
+            self.enemy.health = max(0, self.enemy.health - damage)
+            self.message = f"{self.player.name} blasts the {self.enemy.name} for {damage} damage!"
+
+        elif action == "Forcefield":
+            defense_bonus = self.player.defend()
+            self.message = f"{self.player.name} creates a forcefield, increasing defense by {defense_bonus}!"
+
+        elif action == "Fission":
+            damage = self.player.fission()
+            self.enemy.health = max(0, self.enemy.health - damage)
+            self.message = f"{self.player.name} releases fission energy for {damage} damage!"
+
+        elif action == "Fusion":
+            heal_amount = self.player.fusion()
+            self.message = f"{self.player.name} uses fusion to restore {heal_amount} health!"
+
+        self.last_action = action.lower()
+        self.turn += 1
+
+        # Check win condition
+        if self.enemy.health <= 0:
+            self.state = "win"
+            self.message = f"You defeated the {self.enemy.name}!"
+            exp_gained = self.enemy.exp_reward
+            self.player.gain_experience(exp_gained)
+            self.player.victories += 1
+
+            if self.player.victories >= VICTORIES_TO_WIN:
+                return "game_won"
+
+            return
+
+        self.state = "enemy_turn"
+
+    def enemy_action(self):
+        if self.state != "enemy_turn":
+            return
+
+        action = self.enemy.choose_action()
+
+        if action == "attack":
+            damage = self.enemy.attack()
+            self.player.health = max(0, self.player.health - damage)
+            self.message = f"The {self.enemy.name} attacks for {damage} damage!"
+
+        elif action == "defend":
+            defense_bonus = self.enemy.defend()
+            self.message = f"The {self.enemy.name} strengthens its defenses!"
+
+        elif action == "special":
+            damage = self.enemy.special()
+            self.player.health = max(0, self.player.health - damage)
+
+            # Special message based on enemy type
+            template = self.enemy.type.get("special_message", "The {name} unleashes a cosmic attack for {damage} damage!")
+            self.message = template.format(name=self.enemy.name, damage=damage)
+
+        elif action == "heal":
+            heal_amount = self.enemy.heal()
+            self.message = f"The {self.enemy.name} absorbs cosmic energy and recovers {heal_amount} health!"
+
+        self.last_action = action
+
+        # Check lose condition
+        if self.player.health <= 0:
+            self.state = "lose"
+            self.message = "You have been defeated!"
+            return
+
+        self.state = "player_turn"
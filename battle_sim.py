@@ -0,0 +1,233 @@
+# Batched Monte Carlo battle simulator.
+# Plays many battles at once with the rules from battle_engine.py, one row
+# per battle, so balance changes can be checked without playing by hand:
+#
+#   python battle_sim.py --battles 1000000 --level 3 --action Fission
+import argparse
+import functools
+import time
+
+import numpy as np
+
+from battle_engine import ENEMY_NAMES, ENEMY_TYPES, MENU_ITEMS, enemy_stat_table
+
+# Action ids, in the same order as MENU_ITEMS
+BLAST, FORCEFIELD, FISSION, FUSION = range(4)
+
+# Enemy action ids
+ATTACK, DEFEND, SPECIAL, HEAL = range(4)
+ENEMY_ACTIONS = ["attack", "defend", "special", "heal"]
+
+# Enemy type id of the Black Hole, an index into ENEMY_TYPES
+BLACK_HOLE = ENEMY_NAMES.index("Black Hole")
+
+# Battles still running after this many turns are reported as undecided
+MAX_TURNS = 500
+
+def player_stats(level):
+    # Max health and power of a player that has levelled up to `level`
+    max_health = 100 + 20 * (level - 1)
+    power = 20 + 5 * (level - 1)
+    return max_health, power
+
+@functools.lru_cache(maxsize=None)
+def enemy_stat_columns(level):
+    # battle_engine.enemy_stat_table(level) as one array per stat, indexed
+    # by type id, with the damage ranges split into _low/_high columns
+    table = enemy_stat_table(level)
+    columns = {}
+    for field in ("max_health", "power", "defense", "exp_reward", "heal"):
+        columns[field] = np.array([getattr(stats, field) for stats in table], dtype=np.int64)
+    for field in ("attack", "special"):
+        columns[f"{field}_low"] = np.array([getattr(stats, field)[0] for stats in table], dtype=np.int64)
+        columns[f"{field}_high"] = np.array([getattr(stats, field)[1] for stats in table], dtype=np.int64)
+    return columns
+
+def enemy_stats(level, enemy_type):
+    # Stat arrays (see enemy_stat_columns) for an array of enemy type ids
+    enemy_type = np.asarray(enemy_type)
+    return {field: column[enemy_type] for field, column in enemy_stat_columns(level).items()}
+
+def randint(rng, low, high):
+    # Vectorized random.randint: inclusive on both ends, with int() bounds
+    low = np.floor(low).astype(np.int64)
+    high = np.floor(high).astype(np.int64)
+    return rng.integers(low, high + 1)
+
+def choose_enemy_actions(health, max_health, rng):
+    # Vectorized Enemy.choose_action probability tree
+    count = len(health)
+    actions = np.where(rng.random(count) < 0.7, ATTACK, SPECIAL)
+
+    # Medium health, 30% chance to defend, 10% chance to heal
+    medium = health < max_health * 0.5
+    rand = rng.random(count)
+    actions[medium & (rand < 0.4)] = HEAL
+    actions[medium & (rand < 0.3)] = DEFEND
+
+    # Low health, 50% chance to heal
+    low = health < max_health * 0.3
+    actions[low & (rng.random(count) < 0.5)] = HEAL
+    return actions
+
+def constant_policy(action):
+    # Policy that always picks the same menu action
+    if isinstance(action, str):
+        action = MENU_ITEMS.index(action)
+
+    def policy(player_health, player_max_health, enemy_health, enemy_max_health, enemy_type):
+        return np.full(len(player_health), action)
+
+    return policy
+
+def simulate(battles, level=1, enemy_type=None, policy="Blast", player_health=None,
+             seed=None, max_turns=MAX_TURNS):
+    # Simulate `battles` independent battles of a level `level` player.
+    #
+    # enemy_type is a type id, an array of ids or None for a random type per
+    # battle (like Enemy.__init__). policy is a menu action name/id or a
+    # callable (player_health, player_max_health, enemy_health,
+    # enemy_max_health, enemy_type) -> array of action ids.
+    #
+    # Returns a dict of per-battle arrays: "won" (1 win, 0 loss, -1
+    # undecided), "turns" (player turns taken), "player_health",
+    # "enemy_health", "enemy_type" and "exp_reward".
+    rng = np.random.default_rng(seed)
+    if not callable(policy):
+        policy = constant_policy(policy)
+
+    if enemy_type is None:
+        enemy_type = rng.integers(0, len(ENEMY_TYPES), battles)
+    else:
+        enemy_type = np.broadcast_to(np.asarray(enemy_type, dtype=np.int64), (battles,)).copy()
+
+    max_health, power = player_stats(level)
+    stats = enemy_stats(level, enemy_type)
+
+    won = np.full(battles, -1, dtype=np.int8)
+    turns = np.zeros(battles, dtype=np.int32)
+    final_player_health = np.zeros(battles, dtype=np.int64)
+    final_enemy_health = np.zeros(battles, dtype=np.int64)
+
+    # Working set of running battles, compacted as battles finish
+    index = np.arange(battles)
+    php = np.full(battles, max_health if player_health is None else player_health, dtype=np.int64)
+    ehp = stats["max_health"].copy()
+    emax = stats["max_health"]
+    attack_low, attack_high = stats["attack_low"], stats["attack_high"]
+    special_low, special_high = stats["special_low"], stats["special_high"]
+    eheal = stats["heal"]
+    etype = enemy_type.copy()
+
+    for turn in range(1, max_turns + 1):
+        if len(index) == 0:
+            break
+        count = len(index)
+
+        # Player turn
+        actions = np.asarray(policy(php, np.full(count, max_health), ehp, emax, etype))
+
+        blast = actions == BLAST
+        damage = randint(rng, np.full(count, power * 0.8), np.full(count, power * 1.2))
+        ehp = np.where(blast, np.maximum(0, ehp - damage), ehp)
+
+        fission = actions == FISSION
+        php = np.where(fission, np.maximum(1, php - int(max_health * 0.1)), php)
+        damage = randint(rng, np.full(count, power * 1.5), np.full(count, power * 2.0))
+        ehp = np.where(fission, np.maximum(0, ehp - damage), ehp)
+
+        fusion = actions == FUSION
+        php = np.where(fusion, np.minimum(max_health, php + int(max_health * 0.3)), php)
+
+        # Check win condition
+        finished = ehp <= 0
+        won[index[finished]] = 1
+
+        # Enemy turn, for battles where the enemy survived
+        alive = ~finished
+        enemy_actions = choose_enemy_actions(ehp, emax, rng)
+
+        attack = alive & (enemy_actions == ATTACK)
+        damage = rng.integers(attack_low, attack_high + 1)
+        php = np.where(attack, np.maximum(0, php - damage), php)
+
+        special = alive & (enemy_actions == SPECIAL)
+        damage = rng.integers(special_low, special_high + 1)
+        php = np.where(special, np.maximum(0, php - damage), php)
+
+        heal = alive & (enemy_actions == HEAL)
+        ehp = np.where(heal, np.minimum(emax, ehp + eheal), ehp)
+
+        # Check lose condition
+        lost = alive & (php <= 0)
+        won[index[lost]] = 0
+        finished |= lost
+
+        if finished.any():
+            done = index[finished]
+            turns[done] = turn
+            final_player_health[done] = php[finished]
+            final_enemy_health[done] = ehp[finished]
+
+            keep = ~finished
+            index = index[keep]
+            php = php[keep]
+            ehp = ehp[keep]
+            emax = emax[keep]
+            attack_low, attack_high = attack_low[keep], attack_high[keep]
+            special_low, special_high = special_low[keep], special_high[keep]
+            eheal = eheal[keep]
+            etype = etype[keep]
+
+    # Battles that hit the turn limit
+    turns[index] = max_turns
+    final_player_health[index] = php
+    final_enemy_health[index] = ehp
+
+    return {
+        "won": won,
+        "turns": turns,
+        "player_health": final_player_health,
+        "enemy_health": final_enemy_health,
+        "enemy_type": enemy_type,
+        "exp_reward": stats["exp_reward"],
+    }
+
+def summarize(result):
+    # Win rate and mean turns per enemy type
+    rows = []
+    for type_id, name in enumerate(ENEMY_NAMES):
+        mask = result["enemy_type"] == type_id
+        if not mask.any():
+            continue
+        rows.append({
+            "enemy": name,
+            "battles": int(mask.sum()),
+            "win_rate": float((result["won"][mask] == 1).mean()),
+            "mean_turns": float(result["turns"][mask].mean()),
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Sun Voyage battles in bulk")
+    parser.add_argument("--battles", type=int, default=100000)
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--enemy", choices=ENEMY_NAMES, default=None)
+    parser.add_argument("--action", choices=MENU_ITEMS, default="Blast")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    enemy_type = None if args.enemy is None else ENEMY_NAMES.index(args.enemy)
+
+    start = time.perf_counter()
+    result = simulate(args.battles, args.level, enemy_type, args.action, seed=args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.battles} battles at level {args.level} in {elapsed:.2f}s")
+    for row in summarize(result):
+        print(f"{row['enemy']:<14}{row['battles']:>10}  win {row['win_rate']:6.1%}  turns {row['mean_turns']:5.2f}")
+    print(f"{'Overall':<14}{args.battles:>10}  win {(result['won'] == 1).mean():6.1%}  "
+          f"turns {result['turns'].mean():5.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+# Exact battle outcomes.
+# A battle is a Markov chain over (player HP, enemy HP) at the start of the
+# player's turn. Instead of sampling, the probability mass of every state is
+# pushed forward one turn at a time through the real rules (uniform damage
+# rolls, Enemy.choose_action's fixed probabilities) until almost none is
+# left, which gives exact win probabilities, expected turns and final HP
+# distributions in milliseconds:
+#
+#   python battle_solver.py --level 3 --action Blast
+#
+# The same kernels run backwards give value iteration: optimal_policy()
+# finds the action that maximizes the chance of winning from every state,
+# and policy_table() keeps the result on disk so the autoplayer (sv001.py
+# --autoplay) only does an array lookup per turn:
+#
+#   python battle_solver.py --level 3 --optimal
+import argparse
+import functools
+import os
+import time
+
+import numpy as np
+
+from battle_engine import ENEMY_NAMES, MENU_ITEMS, enemy_stat_table
+from battle_sim import BLAST, FORCEFIELD, FISSION, FUSION, MAX_TURNS, player_stats
+from disk_cache import CACHE_DIR, cached_array
+
+# Stop once less than this much probability is still undecided
+TOLERANCE = 1e-12
+
+# Bump when the battle rules change so stale policy tables are not reused
+POLICY_VERSION = 2
+
+class BattleModel:
+    # Transition kernels for one (level, enemy type) pair. States are held
+    # in a grid indexed [player HP, damage taken by the enemy]; player HP 0
+    # and enemy damage >= enemy_span are absorbing and never stored.
+    def __init__(self, level, enemy_type):
+        self.level = level
+        self.enemy_type = enemy_type
+
+        self.max_health, power = player_stats(level)
+        stats = enemy_stat_table(level)[enemy_type]
+        self.enemy_max_health = stats.max_health
+
+        # The enemy is defeated once damage taken reaches enemy_span
+        self.enemy_span = stats.max_health
+        self.enemy_health = self.enemy_max_health - np.arange(self.enemy_span)
+
+        # Player rolls and costs, as in battle_engine.Player
+        self.blast = (int(power * 0.8), int(power * 1.2))
+        self.fission = (int(power * 1.5), int(power * 2.0))
+        self.fission_cost = int(self.max_health * 0.1)
+        self.fusion_heal = int(self.max_health * 0.3)
+
+        # Enemy rolls, from battle_engine's stat table
+        self.attack = stats.attack
+        self.special = stats.special
+        self.heal = stats.heal
+
+        # Enemy.choose_action probabilities for every enemy HP
+        low = self.enemy_health < self.enemy_max_health * 0.3
+        medium = self.enemy_health < self.enemy_max_health * 0.5
+        self.p_heal = np.where(low, 0.55, np.where(medium, 0.1, 0.0))
+        self.p_defend = np.where(low, 0.15, np.where(medium, 0.3, 0.0))
+        self.p_attack = np.where(low, 0.21, np.where(medium, 0.42, 0.7))
+        self.p_special = np.where(low, 0.09, np.where(medium, 0.18, 0.3))
+
+    def shape(self):
+        return (self.max_health + 1, self.enemy_span)
+
+    def damage_enemy(self, mass, rolls, won):
+        # Spread mass over every damage roll (a box filter done with prefix
+        # sums); mass pushed past the enemy's health is added to won,
+        # indexed by player HP
+        low, high = rolls
+        target = np.arange(self.enemy_span)
+        start = np.clip(target - high, 0, self.enemy_span)
+        stop = np.clip(target - low + 1, 0, self.enemy_span)
+        prefix = np.zeros((mass.shape[0], mass.shape[1] + 1))
+        np.cumsum(mass, axis=1, out=prefix[:, 1:])
+        out = (prefix[:, stop] - prefix[:, start]) / (high - low + 1)
+        won += np.maximum(0.0, mass.sum(axis=1) - out.sum(axis=1))
+        return out
+
+    def damage_player(self, mass, rolls, lost):
+        # Same for enemy hits; lost is indexed by enemy damage taken
+        low, high = rolls
+        top = self.max_health + 1
+        target = np.arange(top)
+        start = np.minimum(target + low, top)
+        stop = np.minimum(target + high + 1, top)
+        prefix = np.zeros((mass.shape[0] + 1, mass.shape[1]))
+        np.cumsum(mass, axis=0, out=prefix[1:])
+        out = (prefix[stop] - prefix[start]) / (high - low + 1)
+        out[0] = 0.0
+        lost += np.maximum(0.0, mass.sum(axis=0) - out.sum(axis=0))
+        return out
+
+    def player_phase(self, mass, actions, won):
+        out = np.zeros_like(mass)
+
+        blast = mass * (actions == BLAST)
+        if blast.any():
+            out += self.damage_enemy(blast, self.blast, won)
+
+        out += mass * (actions == FORCEFIELD)
+
+        fission = mass * (actions == FISSION)
+        if fission.any():
+            # Health cost first (never below 1), then the attack
+            cost = self.fission_cost
+            paid = np.zeros_like(fission)
+            paid[1] = fission[1:cost + 2].sum(axis=0)
+            paid[2:len(paid) - cost] = fission[cost + 2:]
+            out += self.damage_enemy(paid, self.fission, won)
+
+        fusion = mass * (actions == FUSION)
+        if fusion.any():
+            heal = self.fusion_heal
+            top = self.max_health
+            healed = np.zeros_like(fusion)
+            healed[1 + heal:top] = fusion[1:top - heal]
+            healed[top] += fusion[max(1, top - heal):].sum(axis=0)
+            out += healed
+
+        return out
+
+    def enemy_phase(self, mass, lost):
+        out = mass * self.p_defend
+
+        out += self.damage_player(mass * self.p_attack, self.attack, lost)
+        out += self.damage_player(mass * self.p_special, self.special, lost)
+
+        heal = mass * self.p_heal
+        out[:, 0] += heal[:, :self.heal + 1].sum(axis=1)
+        out[:, 1:self.enemy_span - self.heal] += heal[:, self.heal + 1:]
+        return out
+
+    # The same rules backwards: values are win probabilities per state, and
+    # player HP 0 is worth nothing
+
+    def hit_value(self, values, rolls):
+        # Value of taking an enemy hit from every state
+        low, high = rolls
+        top = self.max_health + 1
+        target = np.arange(top)
+        start = np.clip(target - high, 0, top)
+        stop = np.clip(target - low + 1, 0, top)
+        prefix = np.zeros((top + 1, self.enemy_span))
+        np.cumsum(values, axis=0, out=prefix[1:])
+        return (prefix[stop] - prefix[start]) / (high - low + 1)
+
+    def strike_value(self, values, rolls):
+        # Value of hitting the enemy from every state; damage past its
+        # health is a win
+        low, high = rolls
+        target = np.arange(self.enemy_span)
+        padded = np.ones((values.shape[0], self.enemy_span + high + 1))
+        padded[:, 0] = 0.0
+        np.cumsum(values, axis=1, out=padded[:, 1:self.enemy_span + 1])
+        padded[:, self.enemy_span + 1:] = padded[:, self.enemy_span, None] + np.arange(1, high + 1)
+        return (padded[:, target + high + 1] - padded[:, target + low]) / (high - low + 1)
+
+    def enemy_value(self, values):
+        # Value at the start of the enemy's turn
+        out = values * self.p_defend
+        out += self.hit_value(values, self.attack) * self.p_attack
+        out += self.hit_value(values, self.special) * self.p_special
+        healed = np.maximum(0, np.arange(self.enemy_span) - self.heal)
+        out += values[:, healed] * self.p_heal
+        return out
+
+    def action_values(self, values):
+        # Value of each menu action (first axis) at the start of the
+        # player's turn, given the enemy-turn values
+        health = np.arange(self.max_health + 1)
+        out = np.empty((len(MENU_ITEMS),) + self.shape())
+        out[BLAST] = self.strike_value(values, self.blast)
+        out[FORCEFIELD] = values
+        out[FISSION] = self.strike_value(values, self.fission)[np.maximum(1, health - self.fission_cost)]
+        out[FUSION] = values[np.minimum(self.max_health, health + self.fusion_heal)]
+        out[:, 0] = 0.0
+        return out
+
+@functools.lru_cache(maxsize=None)
+def battle_model(level, enemy_type):
+    return BattleModel(level, enemy_type)
+
+def policy_grid(model, policy):
+    # Action id for every state: a menu action name/id or a full grid
+    if isinstance(policy, str):
+        policy = MENU_ITEMS.index(policy)
+    if np.isscalar(policy):
+        return np.full(model.shape(), policy)
+    return np.asarray(policy)
+
+def solve(level, enemy_type, policy="Blast", player_health=None, max_turns=MAX_TURNS, tolerance=TOLERANCE):
+    # Exact outcome of one battle against enemy_type (an id from
+    # battle_engine.ENEMY_NAMES) for a player of the given level.
+    #
+    # Returns a dict with "win", "loss" and "undecided" probabilities,
+    # "expected_turns" (player turns, counting undecided battles up to
+    # max_turns), "turns" (probability the battle ends on each turn),
+    # "player_health" (probability of winning with each player HP) and
+    # "enemy_health" / "enemy_health_values" (probability of losing with the
+    # enemy at each HP).
+    model = battle_model(level, enemy_type)
+    actions = policy_grid(model, policy)
+
+    mass = np.zeros(model.shape())
+    mass[model.max_health if player_health is None else player_health, 0] = 1.0
+
+    won = np.zeros(model.max_health + 1)
+    lost = np.zeros(model.enemy_span)
+    turns = [0.0]
+    expected_turns = 0.0
+
+    for _ in range(max_turns):
+        remaining = mass.sum()
+        if remaining < tolerance:
+            break
+        expected_turns += remaining
+
+        finished = won.sum() + lost.sum()
+        mass = model.player_phase(mass, actions, won)
+        mass = model.enemy_phase(mass, lost)
+        turns.append(won.sum() + lost.sum() - finished)
+
+    return {
+        "win": float(won.sum()),
+        "loss": float(lost.sum()),
+        "undecided": float(mass.sum()),
+        "expected_turns": expected_turns,
+        "turns": np.array(turns),
+        "player_health": won,
+        "enemy_health": lost,
+        "enemy_health_values": model.enemy_health,
+    }
+
+def optimal_policy(level, enemy_type, max_iterations=MAX_TURNS, tolerance=TOLERANCE):
+    # Value iteration for the action that maximizes the chance of winning
+    # from every (player HP, enemy damage taken) state. Ties go to the
+    # earliest menu item, so Blast wins whenever nothing is better.
+    #
+    # Returns (actions, values): action ids and win probabilities per state.
+    model = battle_model(level, enemy_type)
+    values = np.zeros(model.shape())
+    for _ in range(max_iterations):
+        action_values = model.action_values(model.enemy_value(values))
+        best = action_values.max(axis=0)
+        change = np.abs(best - values).max()
+        values = best
+        if change < tolerance:
+            break
+
+    actions = np.argmax(action_values >= values - 1e-9, axis=0).astype(np.uint8)
+    return actions, values
+
+def policy_path(level, enemy_type):
+    return os.path.join(CACHE_DIR, "policies", f"policy-v{POLICY_VERSION}-{level}-{enemy_type}.npy")
+
+@functools.lru_cache(maxsize=None)
+def policy_table(level, enemy_type):
+    # Optimal action ids indexed [player HP, enemy damage taken], loaded
+    # from disk or solved and stored there
+    return cached_array(policy_path(level, enemy_type), lambda: optimal_policy(level, enemy_type)[0])
+
+def choose_action(battle):
+    # Optimal menu item for a battle_engine.Battle on the player's turn
+    player, enemy = battle.player, battle.enemy
+    table = policy_table(player.level, enemy.type_id)
+    damage = min(enemy.max_health - enemy.health, table.shape[1] - 1)
+    return battle.menu_items[table[player.health, damage]]
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact Sun Voyage battle outcomes")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--action", choices=MENU_ITEMS, default="Blast")
+    parser.add_argument("--health", type=int, default=None, help="starting player health (default: full)")
+    parser.add_argument("--optimal", action="store_true", help="play the optimal policy instead of one action")
+    args = parser.parse_args()
+
+    for type_id, name in enumerate(ENEMY_NAMES):
+        start = time.perf_counter()
+        policy = optimal_policy(args.level, type_id)[0] if args.optimal else args.action
+        result = solve(args.level, type_id, policy, args.health)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{name:<14} win {result['win']:8.4%}  turns {result['expected_turns']:6.3f}"
+              f"  undecided {result['undecided']:.1e}  ({elapsed:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Import-to-first-frame benchmark for sv001.py.
+# Every run starts a fresh interpreter under SDL's dummy drivers and times
+# the import, the lazy setup in init_game() and the first title frame:
+#
+#   python benchmarks/bench_startup.py --runs 10 --output startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child process; prints one JSON object of timestamps
+CHILD = """
+import json, time
+start = time.perf_counter()
+import sv001
+imported = time.perf_counter()
+screen = sv001.init_game()
+initialized = time.perf_counter()
+title_screen = sv001.TitleScreen()
+title_screen.update()
+title_screen.draw(screen)
+sv001.pygame.display.flip()
+first_frame = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "init_game": initialized - imported,
+    "first_frame": first_frame - initialized,
+    "import_to_first_frame": first_frame - start,
+}))
+"""
+
+def run_once():
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+               PYGAME_HIDE_SUPPORT_PROMPT="1")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Time sv001 import and first frame")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    results = {
+        name: {
+            "median_ms": statistics.median(run[name] for run in runs) * 1000,
+            "min_ms": min(run[name] for run in runs) * 1000,
+        }
+        for name in runs[0]
+    }
+
+    for name, result in results.items():
+        print(f"{name:<24}{result['median_ms']:9.1f} ms median{result['min_ms']:9.1f} ms min")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"runs": args.runs, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
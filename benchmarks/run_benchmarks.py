@@ -0,0 +1,249 @@
+# Headless micro and macro benchmarks for rendering, simulation and audio.
+# Runs under SDL's dummy video and audio drivers and prints/saves results
+# as JSON so a run can be compared against a saved baseline:
+#
+#   python benchmarks/run_benchmarks.py --save baseline.json
+#   python benchmarks/run_benchmarks.py --compare baseline.json --tolerance 0.25
+#
+# With --compare the exit status is 1 when any benchmark got slower than
+# the baseline by more than the tolerance.
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pygame
+
+import audio_cache
+import battle_engine
+import battle_sim
+import battle_solver
+import particles
+import random_streams
+import starfield
+import sv001
+import synth
+
+LONG_MESSAGE = ("The Supernova explodes with energy, scattering radiant plasma across the "
+                "whole sector and leaving the Sun to weather a storm of charged particles "
+                "for a truly remarkable amount of damage!")
+
+def measure(function, min_time=0.2, repeat=5):
+    # Median seconds per call over `repeat` runs of an auto-sized loop
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or number >= 1 << 20:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {"median_us": statistics.median(timings) * 1e6, "min_us": min(timings) * 1e6, "number": number}
+
+def rendering_benchmarks(screen):
+    results = {}
+
+    for type_index, enemy_type in enumerate(battle_engine.ENEMY_TYPES):
+        enemy = sv001.Enemy(1, type_id=type_index)
+        frame = [0]
+
+        def draw_enemy(enemy=enemy, frame=frame):
+            frame[0] += 1
+            enemy.draw(screen, frame[0] % 30 < 15, frame[0])
+
+        results[f"enemy_draw[{enemy_type['name']}]"] = measure(draw_enemy)
+
+    player = sv001.Player("Benchmark")
+    results["player_draw"] = measure(lambda: player.draw(screen))
+
+    battle = sv001.BattleSystem(player, time_scale=0)
+    battle.new_battle()
+    battle.message = LONG_MESSAGE
+    results["battle_draw[long_message]"] = measure(lambda: battle.draw(screen))
+
+    # A different long message every frame defeats the layout cache
+    messages = [f"{LONG_MESSAGE} ({i})" for i in range(1000)]
+    counter = [0]
+
+    def draw_changing(counter=counter):
+        counter[0] += 1
+        battle.message = messages[counter[0] % len(messages)]
+        battle.draw(screen)
+
+    results["battle_draw[changing_message]"] = measure(draw_changing)
+    return results
+
+def star_benchmarks(screen):
+    results = {}
+    scenes = {
+        "TitleScreen": sv001.TitleScreen(),
+        "NameInputScreen": sv001.NameInputScreen(),
+        "IntroScreen": sv001.IntroScreen("Benchmark"),
+        "BattleSystem": sv001.BattleSystem(sv001.Player(), time_scale=0),
+        "EndingScreen": sv001.EndingScreen(),
+    }
+    for name, scene in scenes.items():
+        stars = scene.stars
+        results[f"stars_update[{name}]"] = measure(stars.update)
+        results[f"stars_draw[{name}]"] = measure(lambda stars=stars: stars.draw(screen))
+
+    many = starfield.Starfield(10000, (0.5, 2.0), "down", (sv001.WIDTH, sv001.HEIGHT))
+
+    def update_and_draw():
+        many.update()
+        many.draw(screen)
+
+    results["stars_frame[10k]"] = measure(update_and_draw)
+    return results
+
+def particle_benchmarks(screen):
+    # Two supernovas, a black hole and a fission burst at once
+    effects = ("supernova", "supernova", "black_hole", "fission")
+    system = particles.ParticleSystem(rng=np.random.default_rng(0))
+
+    def refill():
+        system.clear()
+        for name in effects:
+            system.spawn(name, (sv001.WIDTH // 2, 100))
+
+    refill()
+    full = len(system)
+    results = {f"particles_draw[{full // 1000}k]": measure(lambda: system.draw(screen))}
+
+    def update_and_draw():
+        # Top up once half the particles are gone
+        if len(system) < full // 2:
+            refill()
+        system.update()
+        system.draw(screen)
+
+    results["particles_frame[effects]"] = measure(update_and_draw)
+    results["particles_spawn[supernova]"] = measure(
+        lambda: (system.clear(), system.spawn("supernova", (sv001.WIDTH // 2, 100))))
+    return results
+
+def audio_benchmarks():
+    title_notes = sv001.TITLE_NOTES
+    frequencies = (440, 523.25, 659.25, 783.99)
+    voices = [sv001.tone_voice(frequency) for frequency in frequencies]
+    enemy_voices = [sv001.tone_voice(frequency, is_enemy=True) for frequency in frequencies]
+    return {
+        "synth_voice": measure(lambda: synth.render_voices([sv001.tone_voice(440)])),
+        "synth_voice[noise]": measure(lambda: synth.render_voices([sv001.tone_voice(415.30, is_enemy=True)])),
+        "synthesize_melody[title]": measure(lambda: audio_cache.synthesize_melody(title_notes)),
+        "synthesize_melody[title, harmonic]": measure(
+            lambda: audio_cache.synthesize_melody(title_notes, harmonic=0.3)),
+        "create_tone": measure(lambda: sv001.create_tone(440)),
+        "synth_voices[4]": measure(lambda: synth.render_voices(voices)),
+        "synth_voices[4, noise]": measure(lambda: synth.render_voices(enemy_voices)),
+    }
+
+def logic_benchmarks(turns):
+    def play_turns():
+        player = battle_engine.Player()
+        battle = battle_engine.Battle(player)
+        battle.new_battle()
+        for _ in range(turns):
+            if battle.state == "player_turn":
+                battle.player_action("Blast")
+            elif battle.state == "enemy_turn":
+                battle.enemy_action()
+            else:
+                player.health = player.max_health
+                battle.new_battle()
+
+    battle = battle_engine.Battle(battle_engine.Player())
+    battle.new_battle()
+    battle_solver.choose_action(battle)
+    snapshot = battle.snapshot()
+
+    def snapshot_round_trip():
+        battle.snapshot(snapshot, rng=False)
+        battle.restore(snapshot)
+
+    return {
+        f"battle_turns[{turns}]": measure(play_turns, repeat=3),
+        "batch_sim[100k battles]": measure(lambda: battle_sim.simulate(100000, seed=0), repeat=3),
+        "exact_solve[level 1]": measure(lambda: battle_solver.solve(1, battle_sim.BLACK_HOLE), repeat=3),
+        "policy_lookup": measure(lambda: battle_solver.choose_action(battle)),
+        "battle_snapshot": measure(snapshot_round_trip),
+    }
+
+def run(turns):
+    random_streams.seed(0)
+    screen = sv001.init_game()
+    results = {}
+    results.update(rendering_benchmarks(screen))
+    results.update(star_benchmarks(screen))
+    results.update(particle_benchmarks(screen))
+    results.update(audio_benchmarks())
+    results.update(logic_benchmarks(turns))
+    return results
+
+def compare(results, baseline, tolerance):
+    # Names of benchmarks that are slower than baseline * (1 + tolerance)
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before = baseline[name]["median_us"]
+        ratio = result["median_us"] / before if before else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40}{before:12.1f}{result['median_us']:12.1f} us  x{ratio:5.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Sun Voyage benchmark suite")
+    parser.add_argument("--turns", type=int, default=1000, help="battle turns per logic benchmark")
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a benchmark counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args.turns)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "pygame": pygame.version.ver,
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        for name, result in results.items():
+            print(f"{name:<40}{result['median_us']:12.1f} us")
+
+if __name__ == "__main__":
+    main()
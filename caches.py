@@ -0,0 +1,73 @@
+# Small LRU caches for things that are expensive to rebuild every frame:
+# rendered text, wrapped text layouts and pre-rendered sprites.
+from collections import OrderedDict
+
+class LRUCache:
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, factory):
+        # Return the cached value for key, building it with factory() on a miss
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = factory()
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+# Rendered text surfaces keyed by (font, text, color, antialias)
+class TextCache(LRUCache):
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        return self.get(key, lambda: font.render(text, antialias, color))
+
+# Word-wrapped lines keyed by (font, message, width)
+class LayoutCache(LRUCache):
+    def wrap(self, font, message, width):
+        return self.get((font, message, width), lambda: wrap_text(font, message, width))
+
+def wrap_text(font, message, width):
+    # Greedy word wrap, keeping lines narrower than width
+    wrapped_text = []
+    words = message.split()
+    line = ""
+    for word in words:
+        test_line = line + word + " "
+        text_width, _ = font.size(test_line)
+        if text_width < width:
+            line = test_line
+        else:
+            wrapped_text.append(line)
+            line = word + " "
+    wrapped_text.append(line)
+    return tuple(wrapped_text)
+
+text_cache = TextCache(512)
+layout_cache = LayoutCache(128)
@@ -0,0 +1,223 @@
+# Full-campaign Monte Carlo simulator.
+# Plays whole games with the real battle_engine classes: a level 1 Player
+# fights battle after battle (health carries over, experience levels it up)
+# until VICTORIES_TO_WIN or defeat. Campaigns are split into chunks that run
+# on a process pool, each chunk with its own seed, and every finished chunk
+# is folded into fixed-size running statistics, so memory stays flat however
+# many campaigns are played:
+#
+#   python campaign_sim.py --campaigns 10000000 --policy optimal --output stats.json
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import battle_solver
+from battle_engine import ENEMY_NAMES, MENU_ITEMS, VICTORIES_TO_WIN, Battle, Player
+from battle_sim import MAX_TURNS
+from random_streams import RandomStreams
+
+# Levels above this are counted in the last bin
+MAX_LEVEL = 32
+
+# Campaigns per task sent to a worker
+CHUNK_SIZE = 2000
+
+class CampaignStats:
+    # Running totals that can be merged; all arrays have a fixed size
+    def __init__(self):
+        self.campaigns = 0
+        self.won = 0
+        self.lost = 0
+        self.stalled = 0
+        self.battles = 0
+        # Victories reached when a campaign ended
+        self.victories = np.zeros(VICTORIES_TO_WIN + 1, dtype=np.int64)
+        # Sum of player levels after the k-th victory, and how many got there
+        self.level_sum = np.zeros(VICTORIES_TO_WIN + 1, dtype=np.int64)
+        self.level_count = np.zeros(VICTORIES_TO_WIN + 1, dtype=np.int64)
+        self.final_level = np.zeros(MAX_LEVEL + 1, dtype=np.int64)
+        # Player turns per battle, overall and per enemy type
+        self.turns = np.zeros(MAX_TURNS + 1, dtype=np.int64)
+        self.enemy_battles = np.zeros(len(ENEMY_NAMES), dtype=np.int64)
+        self.enemy_turns = np.zeros(len(ENEMY_NAMES), dtype=np.int64)
+        # Enemy type that ended each lost campaign
+        self.killers = np.zeros(len(ENEMY_NAMES), dtype=np.int64)
+
+    def add_battle(self, enemy_type, turns):
+        self.battles += 1
+        self.turns[min(turns, MAX_TURNS)] += 1
+        self.enemy_battles[enemy_type] += 1
+        self.enemy_turns[enemy_type] += turns
+
+    def add_victory(self, victories, level):
+        self.level_sum[victories] += level
+        self.level_count[victories] += 1
+
+    def add_campaign(self, outcome, victories, level, enemy_type):
+        # outcome is "win", "lose" or "stalled" (a battle hit MAX_TURNS)
+        self.campaigns += 1
+        if outcome == "win":
+            self.won += 1
+        elif outcome == "lose":
+            self.lost += 1
+            self.killers[enemy_type] += 1
+        else:
+            self.stalled += 1
+        self.victories[min(victories, VICTORIES_TO_WIN)] += 1
+        self.final_level[min(level, MAX_LEVEL)] += 1
+
+    def merge(self, other):
+        self.campaigns += other.campaigns
+        self.won += other.won
+        self.lost += other.lost
+        self.stalled += other.stalled
+        self.battles += other.battles
+        for name in ("victories", "level_sum", "level_count", "final_level",
+                     "turns", "enemy_battles", "enemy_turns", "killers"):
+            getattr(self, name)[:] += getattr(other, name)
+
+    def turn_percentile(self, q):
+        if self.battles == 0:
+            return 0
+        return int(np.searchsorted(np.cumsum(self.turns), q / 100 * self.battles))
+
+    def summary(self):
+        campaigns = max(self.campaigns, 1)
+        reached = np.maximum(self.level_count, 1)
+        return {
+            "campaigns": self.campaigns,
+            "win_rate": self.won / campaigns,
+            "loss_rate": self.lost / campaigns,
+            "stall_rate": self.stalled / campaigns,
+            "battles": self.battles,
+            "mean_victories": float((self.victories * np.arange(len(self.victories))).sum() / campaigns),
+            "level_curve": [
+                {"victories": k, "campaigns": int(self.level_count[k]),
+                 "mean_level": float(self.level_sum[k] / reached[k])}
+                for k in range(1, VICTORIES_TO_WIN + 1)
+            ],
+            "final_level": {str(level): int(count) for level, count in enumerate(self.final_level) if count},
+            "turns_per_battle": {
+                "mean": float((self.turns * np.arange(len(self.turns))).sum() / max(self.battles, 1)),
+                "p50": self.turn_percentile(50),
+                "p95": self.turn_percentile(95),
+                "p99": self.turn_percentile(99),
+            },
+            "enemies": [
+                {"enemy": name, "battles": int(self.enemy_battles[i]),
+                 "mean_turns": float(self.enemy_turns[i] / max(self.enemy_battles[i], 1)),
+                 "kills": int(self.killers[i])}
+                for i, name in enumerate(ENEMY_NAMES)
+            ],
+        }
+
+def run_campaign(player, battle, choose, stats):
+    # Play one campaign with the real rules and record it in stats
+    while True:
+        battle.new_battle()
+        enemy_type = battle.enemy.type_id
+        turns = 0
+        while turns < MAX_TURNS and battle.state in ("player_turn", "enemy_turn"):
+            if battle.state == "player_turn":
+                battle.player_action(choose(battle))
+                turns += 1
+            else:
+                battle.enemy_action()
+        stats.add_battle(enemy_type, turns)
+
+        if battle.state == "win":
+            stats.add_victory(min(player.victories, VICTORIES_TO_WIN), player.level)
+            if player.victories >= VICTORIES_TO_WIN:
+                outcome = "win"
+                break
+        else:
+            outcome = "lose" if battle.state == "lose" else "stalled"
+            break
+
+    stats.add_campaign(outcome, player.victories, player.level, enemy_type)
+
+def run_chunk(campaigns, seed, policy):
+    # Worker entry point: `campaigns` campaigns from one seeded stream
+    rng = RandomStreams(seed).python("battle")
+    if policy == "optimal":
+        choose = battle_solver.choose_action
+    else:
+        choose = lambda battle: policy
+
+    stats = CampaignStats()
+    for _ in range(campaigns):
+        player = Player(rng=rng)
+        run_campaign(player, Battle(player, rng), choose, stats)
+    return stats
+
+def chunk_seeds(seed, chunks):
+    # Independent 64-bit seeds for every chunk, derived from one seed
+    for child in np.random.SeedSequence(seed).spawn(chunks):
+        yield int(child.generate_state(1, np.uint64)[0])
+
+def simulate(campaigns, policy="Blast", seed=None, workers=None, chunk_size=CHUNK_SIZE, progress=None):
+    # Run campaigns on a process pool and return the merged CampaignStats.
+    # Only a couple of chunks per worker are in flight at once.
+    workers = workers or os.cpu_count() or 1
+    chunks = -(-campaigns // chunk_size)
+    sizes = (min(chunk_size, campaigns - i * chunk_size) for i in range(chunks))
+    tasks = zip(sizes, chunk_seeds(seed, chunks))
+
+    stats = CampaignStats()
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        for size, chunk_seed in tasks:
+            pending.add(pool.submit(run_chunk, size, chunk_seed, policy))
+            if len(pending) >= workers * 2:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    stats.merge(future.result())
+                if progress:
+                    progress(stats)
+        for future in concurrent.futures.as_completed(pending):
+            stats.merge(future.result())
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate complete Sun Voyage campaigns")
+    parser.add_argument("--campaigns", type=int, default=100000)
+    parser.add_argument("--policy", choices=MENU_ITEMS + ["optimal"], default="Blast",
+                        help="menu action to always pick, or the solver's optimal policy")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--output", metavar="PATH", help="write the summary as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(stats):
+        rate = stats.campaigns / (time.perf_counter() - start)
+        print(f"\r{stats.campaigns}/{args.campaigns} campaigns  {rate:,.0f}/s", end="", file=sys.stderr)
+
+    stats = simulate(args.campaigns, args.policy, args.seed, args.workers, args.chunk_size, progress)
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+
+    summary = stats.summary()
+    print(f"{stats.campaigns} campaigns ({args.policy}) in {elapsed:.1f}s")
+    print(f"win {summary['win_rate']:6.2%}  lose {summary['loss_rate']:6.2%}  stalled {summary['stall_rate']:6.2%}"
+          f"  mean victories {summary['mean_victories']:.2f}")
+    turns = summary["turns_per_battle"]
+    print(f"turns per battle: mean {turns['mean']:.2f}  p50 {turns['p50']}  p95 {turns['p95']}  p99 {turns['p99']}")
+    print("level after victory: " + "  ".join(
+        f"{row['victories']}:{row['mean_level']:.2f}" for row in summary["level_curve"]))
+    for row in summary["enemies"]:
+        print(f"{row['enemy']:<14}{row['battles']:>10}  turns {row['mean_turns']:5.2f}  kills {row['kills']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
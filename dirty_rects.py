@@ -0,0 +1,53 @@
+# Dirty-rectangle rendering.
+# Screens still draw a complete frame, but into an off-screen buffer; only
+# the regions they report as changed are copied to the display and pushed
+# with pygame.display.update(rects) instead of a full flip.
+import pygame
+
+class RegionTracker:
+    # Remembers a key and rect per named region and reports the region
+    # whenever its key differs from the previous frame. The old rect is
+    # reported too, so a region that shrinks or moves is fully erased.
+    def __init__(self):
+        self.regions = {}
+
+    def check(self, name, rect, key, rects):
+        rect = pygame.Rect(rect)
+        previous = self.regions.get(name)
+        if previous is None or previous[0] != key:
+            if previous is not None and previous[1] != rect:
+                rects.append(previous[1])
+            rects.append(rect)
+        self.regions[name] = (key, rect)
+
+class DirtyRenderer:
+    def __init__(self, screen):
+        self.screen = screen
+        self.buffer = pygame.Surface(screen.get_size()).convert(screen)
+        self.screen_rect = screen.get_rect()
+        self.full_update = True
+        self.pixels_pushed = 0
+
+    def invalidate(self):
+        # Push the whole buffer on the next present (e.g. after a scene change)
+        self.full_update = True
+
+    def present(self, rects):
+        # A rect covering the whole screen makes every other one redundant
+        if self.full_update or any(self.screen_rect.clip(rect) == self.screen_rect for rect in rects):
+            self.screen.blit(self.buffer, (0, 0))
+            pygame.display.flip()
+            self.full_update = False
+            self.pixels_pushed = self.screen_rect.width * self.screen_rect.height
+            return
+
+        clipped = []
+        for rect in rects:
+            rect = self.screen_rect.clip(rect)
+            if rect.width and rect.height:
+                self.screen.blit(self.buffer, rect, rect)
+                clipped.append(rect)
+
+        if clipped:
+            pygame.display.update(clipped)
+        self.pixels_pushed = sum(rect.width * rect.height for rect in clipped)
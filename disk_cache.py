@@ -0,0 +1,41 @@
+# Writing files safely, and the on-disk cache for the solved battle
+# policies. Cached arrays are kept as .npy files under CACHE_DIR. Every file
+# the game writes, campaign saves included, goes through write_atomic: a
+# temporary file, synced to disk, then os.replace, so a crash or a second
+# copy of the game writing at the same time never leaves a broken file
+# behind.
+import io
+import os
+
+import numpy as np
+
+CACHE_DIR = os.environ.get(
+    "SUN_VOYAGE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "sun_voyage")
+)
+
+def write_atomic(path, data):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def cached_array(path, build, mmap_mode=None):
+    # Load the array stored at path, or build it with build() and store it
+    try:
+        return np.load(path, mmap_mode=mmap_mode)
+    except (OSError, ValueError):
+        pass
+
+    data = build()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = io.BytesIO()
+        np.save(buffer, data)
+        write_atomic(path, buffer.getvalue())
+    except OSError:
+        # A read-only cache only costs us the speed-up
+        pass
+    return data
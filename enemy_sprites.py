@@ -0,0 +1,157 @@
+# Pre-rendered enemy sprites.
+# Each enemy body is drawn once per (type, radius, flash, animation frame)
+# onto its own Surface and kept in a size-limited cache, so drawing an enemy
+# is a single blit. Types with random detail (Meteor, Asteroid, Nebula) get
+# a small fixed set of pre-generated frames instead of new shapes every tick.
+import random
+
+import numpy as np
+import pygame
+
+from caches import LRUCache
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+PURPLE = (128, 0, 128)
+
+# Number of pre-generated frames for types with random jitter
+ANIMATION_FRAMES = 8
+JITTER_TYPES = ("Meteor", "Nebula", "Asteroid")
+
+# Unit vectors for the ray and polygon shapes, computed once
+_DIRECTIONS = {
+    count: (np.cos(np.arange(count) * 2 * np.pi / count), np.sin(np.arange(count) * 2 * np.pi / count))
+    for count in (8, 10, 12)
+}
+
+sprite_cache = LRUCache(64)
+
+def sprite_extent(radius):
+    # Half the side of a sprite: room for the comet tail and the ray tips
+    return max(2 * radius, radius + 32)
+
+def _rays(surface, color, center, inner, outer, count, width):
+    cos, sin = _DIRECTIONS[count]
+    for c, s in zip(cos, sin):
+        start = (center[0] + int(inner * c), center[1] + int(inner * s))
+        end = (center[0] + int(outer * c), center[1] + int(outer * s))
+        pygame.draw.line(surface, color, start, end, width)
+
+def _irregular_polygon(rng, center, radius, count):
+    cos, sin = _DIRECTIONS[count]
+    points = []
+    for c, s in zip(cos, sin):
+        r = radius * (0.8 + rng.random() * 0.4)
+        points.append((center[0] + int(r * c), center[1] + int(r * s)))
+    return points
+
+def render_enemy(name, color, radius, flash=False, frame=0):
+    extent = sprite_extent(radius)
+    surface = pygame.Surface((extent * 2, extent * 2), pygame.SRCALPHA)
+    center = (extent, extent)
+    rng = random.Random(f"{name}:{radius}:{frame}")
+
+    # Draw the enemy based on its type
+    if flash:
+        color = WHITE  # Flash white when hit
+
+    if name == "Planet":
+        pygame.draw.circle(surface, color, center, radius)
+        # Draw some details on the planet
+        pygame.draw.arc(surface, (200, 200, 200), (center[0] - radius, center[1] - radius,
+                                                   radius * 2, radius * 2),
+                        0, np.pi / 2, 2)
+
+    elif name == "Comet":
+        # Draw comet head
+        pygame.draw.circle(surface, color, center, radius)
+        # Draw comet tail
+        points = [
+            (center[0], center[1] - radius),
+            (center[0] - radius * 2, center[1] - radius * 2),
+            (center[0], center[1] + radius)
+        ]
+        pygame.draw.polygon(surface, color, points)
+
+    elif name == "Black Hole":
+        # Outer ring
+        pygame.draw.circle(surface, (100, 0, 100), center, radius + 10)
+        # Inner black hole
+        pygame.draw.circle(surface, BLACK, center, radius)
+        # Draw some "gravitational lensing" effect
+        _rays(surface, PURPLE, center, radius + 10, radius + 30, 8, 2)
+
+    elif name == "Meteor":
+        # Draw irregular meteor shape
+        pygame.draw.polygon(surface, color, _irregular_polygon(rng, center, radius, 8))
+
+        # Draw some meteor details
+        for _ in range(5):
+            x = center[0] + rng.randint(-radius // 2, radius // 2)
+            y = center[1] + rng.randint(-radius // 2, radius // 2)
+            pygame.draw.circle(surface, (100, 100, 100), (x, y), 3)
+
+    elif name == "Nebula":
+        # Draw several overlapping circles for cloud effect
+        for offset_x, offset_y, size in [
+            (-10, -10, 0.7),
+            (10, -15, 0.8),
+            (15, 5, 0.75),
+            (-5, 10, 0.9),
+            (0, 0, 1)
+        ]:
+            pygame.draw.circle(surface, color, (center[0] + offset_x, center[1] + offset_y), int(radius * size))
+
+        # Add some stars inside the nebula
+        for _ in range(10):
+            x = rng.randint(-radius, radius)
+            y = rng.randint(-radius, radius)
+            # Only draw if point is roughly inside the nebula
+            if x ** 2 + y ** 2 < radius ** 2:
+                pygame.draw.circle(surface, WHITE, (center[0] + x, center[1] + y), 2)
+
+    elif name == "Neutron Star":
+        # Draw the star
+        pygame.draw.circle(surface, color, center, radius)
+
+        # Draw pulsing rings
+        for i in range(3):
+            ring_radius = radius + 10 + (i * 10)
+            pygame.draw.circle(surface, color, center, ring_radius, 2)
+
+        # Draw core
+        pygame.draw.circle(surface, WHITE, center, radius // 2)
+
+    elif name == "Supernova":
+        # Draw the expanding explosion
+        for i in range(3):
+            explosion_radius = radius - (i * 10)
+            color_val = min(255, 150 + i * 50)
+            explosion_color = (color_val, 100 - i * 30, 0)
+            pygame.draw.circle(surface, explosion_color, center, explosion_radius)
+
+        # Draw some explosion rays
+        _rays(surface, (255, 200, 0), center, radius, radius + 30, 12, 3)
+
+    elif name == "Asteroid":
+        # Draw irregular asteroid shape
+        pygame.draw.polygon(surface, color, _irregular_polygon(rng, center, radius, 10))
+
+        # Draw some crater details
+        for _ in range(4):
+            x = center[0] + rng.randint(-radius // 2, radius // 2)
+            y = center[1] + rng.randint(-radius // 2, radius // 2)
+            crater_size = rng.randint(4, 8)
+            pygame.draw.circle(surface, (50, 50, 50), (x, y), crater_size)
+            pygame.draw.circle(surface, (30, 30, 30), (x, y), crater_size - 2)
+
+    # Match the display format once a display exists
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha()
+    return surface
+
+def get_enemy_sprite(name, color, radius, flash=False, frame=0):
+    # Only the jittering types have more than one frame
+    frame = frame % ANIMATION_FRAMES if name in JITTER_TYPES else 0
+    key = (name, radius, flash, frame)
+    return sprite_cache.get(key, lambda: render_enemy(name, color, radius, flash, frame))
@@ -0,0 +1,140 @@
+# Frame capture for trailers and visual regression checks.
+# main() hands every presented frame to FrameCapture.capture(), which only
+# copies the surface's raw pixel memory into a bounded queue; a background
+# thread converts them to RGB and writes them out as either
+#
+#   raw: one frames.rgb stream of packed RGB24 frames, e.g. for
+#        ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 60 -i frames.rgb
+#   png: frame_000123.png per frame, numbered by game frame
+#
+# plus capture.json describing the run. When the writer falls behind, the
+# "drop" policy skips frames (the render loop never waits) and "block"
+# waits for a free slot (every frame is kept).
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+
+import numpy as np
+import pygame
+
+# Frames held in memory between the render loop and the writer
+QUEUE_SIZE = 8
+
+# zlib level for PNG frames; low levels keep the writer ahead of the game
+PNG_COMPRESSION = 3
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def encode_png(data, width, height, compression=PNG_COMPRESSION):
+    # PNG bytes for packed RGB24 pixels. zlib releases the GIL, so encoding
+    # on the writer thread doesn't hold up the game.
+    rows = np.frombuffer(data, dtype=np.uint8).reshape(height, width * 3)
+    filtered = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    filtered[:, 1:] = rows
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+        png_chunk(b"IDAT", zlib.compress(filtered.tobytes(), compression)),
+        png_chunk(b"IEND", b""),
+    ])
+
+class FrameCapture:
+    def __init__(self, directory, size, fps, image_format="raw", policy="drop", queue_size=QUEUE_SIZE):
+        if image_format not in ("raw", "png"):
+            raise ValueError(f"unknown capture format {image_format!r}")
+        if policy not in ("drop", "block"):
+            raise ValueError(f"unknown capture policy {policy!r}")
+
+        self.directory = directory
+        self.width, self.height = size
+        self.fps = fps
+        self.image_format = image_format
+        self.policy = policy
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.layout = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.stream = open(os.path.join(directory, "frames.rgb"), "wb") if image_format == "raw" else None
+        self.queue = queue.Queue(queue_size)
+        self.thread = threading.Thread(target=self.run, name="frame-capture", daemon=True)
+        self.thread.start()
+
+    def pixel_layout(self, surface):
+        # (pitch, byte offsets of R, G, B) for 32-bit surfaces, whose memory
+        # is copied as-is and converted on the writer thread; None for other
+        # depths, which are converted with image.tobytes straight away
+        if surface.get_bytesize() != 4 or sys.byteorder != "little":
+            return None
+        return (surface.get_pitch(),) + tuple(shift // 8 for shift in surface.get_shifts()[:3])
+
+    def to_rgb(self, data):
+        if self.layout is None:
+            return data
+        pitch, red, green, blue = self.layout
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(self.height, pitch)[:, :self.width * 4]
+        pixels = pixels.reshape(self.height, self.width, 4)
+        rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        rgb[..., 0] = pixels[..., red]
+        rgb[..., 1] = pixels[..., green]
+        rgb[..., 2] = pixels[..., blue]
+        return rgb.tobytes()
+
+    def capture(self, surface, frame):
+        # Queue a copy of the surface's pixels as game frame `frame`
+        if self.policy == "drop" and self.queue.full():
+            self.dropped += 1
+            return
+        if self.captured == 0:
+            self.layout = self.pixel_layout(surface)
+        if self.layout is None:
+            data = pygame.image.tobytes(surface, "RGB")
+        else:
+            data = surface.get_buffer().raw
+        item = (frame, data)
+        if self.policy == "drop":
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return
+        else:
+            self.queue.put(item)
+        self.captured += 1
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            frame, data = item
+            data = self.to_rgb(data)
+            if self.stream:
+                self.stream.write(data)
+            else:
+                with open(os.path.join(self.directory, f"frame_{frame:06d}.png"), "wb") as f:
+                    f.write(encode_png(data, self.width, self.height))
+            self.written += 1
+
+    def close(self):
+        # Write out everything still queued, then describe the capture
+        self.queue.put(None)
+        self.thread.join()
+        if self.stream:
+            self.stream.close()
+        with open(os.path.join(self.directory, "capture.json"), "w") as f:
+            json.dump({
+                "format": self.image_format,
+                "width": self.width,
+                "height": self.height,
+                "fps": self.fps,
+                "policy": self.policy,
+                "frames": self.written,
+                "dropped": self.dropped,
+            }, f, indent=2)
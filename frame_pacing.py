@@ -0,0 +1,117 @@
+# Frame pacing and the fixed simulation step.
+# Scenes update in fixed steps of 1/step_rate seconds, driven by real
+# elapsed time: each frame adds the time since the previous one to an
+# accumulator and runs as many whole steps as it holds (steps), which may be
+# none on a fast display or several after a slow frame. What is left over,
+# as a fraction of a step (alpha), lets scenes draw their moving parts
+# between the last two steps, so motion stays smooth at any frame rate and
+# gameplay timing doesn't depend on it.
+#
+# The frame rate itself adapts: every scene says how many frames per second
+# it needs right now through frame_rate() (None for the full render rate),
+# so slow stars and a blinking cursor get by with far fewer. Below the full
+# rate the loop sleeps in pygame.event.wait with a timeout instead of
+# clock.tick, so a key press wakes it at once, and after any input it stays
+# at the full rate for a moment so menus respond smoothly. A hidden or
+# minimized window drops to HIDDEN_FPS whatever the scene wants.
+import time
+
+import pygame
+
+# Events that count as input and bring back the full frame rate
+INPUT_EVENTS = {
+    pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT,
+    pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.MOUSEWHEEL,
+    pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP, pygame.JOYAXISMOTION, pygame.JOYHATMOTION,
+}
+
+# Seconds of full frame rate after the last input
+INPUT_BOOST = 1.0
+
+# Frame rate while the window is hidden or minimized
+HIDDEN_FPS = 2
+
+# Longest stretch of real time one frame catches up on; after a longer
+# stall (a dragged window, a debugger) the game just resumes
+MAX_CATCH_UP = 0.5
+
+class FramePacer:
+    # render_fps is the full frame rate (default: the step rate). With
+    # locked=True every frame is exactly one step at the step rate, as
+    # recordings, replays and captures expect; max_speed (which implies
+    # locked) doesn't wait at all.
+    def __init__(self, step_rate, render_fps=None, adaptive=True, locked=False, max_speed=False):
+        self.step_rate = step_rate
+        self.step = 1 / step_rate
+        self.locked = locked or max_speed
+        self.render_fps = step_rate if self.locked else (render_fps or step_rate)
+        self.adaptive = adaptive and not self.locked
+        self.max_speed = max_speed
+        self.clock = pygame.time.Clock()
+        self.rate = self.render_fps
+        self.steps = 1
+        self.alpha = 1.0
+        self.accumulator = 0.0
+        self.woken = []
+        self.last_input = None
+        self.frame_start = None
+
+    def get_events(self):
+        # Start a frame: this frame's events (including the one that ended
+        # the last wait), its number of update steps and alpha
+        now = time.perf_counter()
+        events = self.woken + pygame.event.get()
+        self.woken = []
+        if any(event.type in INPUT_EVENTS for event in events):
+            self.last_input = now
+
+        if self.locked:
+            self.steps = 1
+            self.alpha = 1.0
+        else:
+            if self.frame_start is None:
+                # The first frame runs one step
+                self.accumulator = self.step
+            else:
+                self.accumulator += min(now - self.frame_start, MAX_CATCH_UP)
+            self.steps = int(self.accumulator / self.step)
+            self.accumulator -= self.steps * self.step
+            self.alpha = self.accumulator / self.step
+        self.frame_start = now
+        return events
+
+    def frame_rate(self, scene):
+        # Frames per second to run at after this frame
+        if not self.adaptive:
+            return self.render_fps
+        if not pygame.display.get_active():
+            return HIDDEN_FPS
+        if self.last_input is not None and time.perf_counter() - self.last_input < INPUT_BOOST:
+            return self.render_fps
+        rate = scene.frame_rate()
+        return self.render_fps if rate is None else min(self.render_fps, rate)
+
+    def wait(self, scene):
+        # End a frame: sleep until the next one is due
+        self.rate = self.frame_rate(scene)
+        if self.max_speed:
+            self.clock.tick(0)
+            return
+        if self.rate >= self.render_fps:
+            self.clock.tick(self.render_fps)
+            return
+
+        # Other events (window, audio, timers) are kept for the next frame
+        # without ending the wait early
+        due = self.frame_start + 1 / self.rate
+        while True:
+            timeout = int((due - time.perf_counter()) * 1000)
+            if timeout <= 0:
+                break
+            event = pygame.event.wait(timeout)
+            if event.type == pygame.NOEVENT:
+                break
+            self.woken.append(event)
+            if event.type in INPUT_EVENTS:
+                break
+        self.clock.tick()
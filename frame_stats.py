@@ -0,0 +1,169 @@
+# Per-scene frame-time instrumentation.
+# main() calls begin_frame(), lap("events") / lap("update") / lap("draw") /
+# lap("flip") (plus lap("capture") when capturing frames) and
+# end_frame(scene) every frame. Samples go into rolling windows per (scene,
+# section) for percentiles, plus cumulative fixed-bin histograms and
+# missed-deadline counts for export. When disabled every call returns
+# straight away.
+import csv
+import json
+import time
+
+import numpy as np
+import pygame
+
+SECTIONS = ("events", "update", "draw", "flip", "capture", "work", "interval")
+
+# Histogram bin edges in milliseconds: 0.25 ms steps up to 50 ms, then overflow
+HISTOGRAM_EDGES = np.append(np.arange(0, 50.25, 0.25), np.inf)
+
+# Frames between overlay refreshes
+OVERLAY_REFRESH = 30
+
+class TimingSeries:
+    def __init__(self, window):
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.histogram = np.zeros(len(HISTOGRAM_EDGES) - 1, dtype=np.int64)
+
+    def add(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+        self.total += value
+        self.histogram[np.searchsorted(HISTOGRAM_EDGES, value, side="right") - 1] += 1
+
+    def recent(self):
+        return self.samples[:min(self.count, len(self.samples))]
+
+    def summary(self):
+        recent = self.recent()
+        if len(recent) == 0:
+            return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        p50, p95, p99 = np.percentile(recent, (50, 95, 99))
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(recent.max()),
+        }
+
+class FrameStats:
+    def __init__(self, fps, enabled=False, window=600):
+        self.enabled = enabled
+        self.budget = 1000 / fps
+        self.window = window
+        self.series = {}
+        self.frames = {}
+        self.missed = {}
+        self.overlay = False
+        self.overlay_surface = None
+        self.frame_start = None
+        self.last_lap = None
+        self.laps = []
+
+    def toggle_overlay(self):
+        # The overlay needs data, so showing it also turns recording on
+        self.overlay = not self.overlay
+        if self.overlay:
+            self.enabled = True
+        self.overlay_surface = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.laps.append(("interval", (now - self.frame_start) * 1000))
+        self.frame_start = self.last_lap = now
+
+    def lap(self, section):
+        # Time since the previous lap (or the frame start) goes to section
+        if not self.enabled or self.last_lap is None:
+            return
+        now = time.perf_counter()
+        self.laps.append((section, (now - self.last_lap) * 1000))
+        self.last_lap = now
+
+    def end_frame(self, scene):
+        if not self.enabled or self.frame_start is None:
+            return
+        name = type(scene).__name__
+        work = (time.perf_counter() - self.frame_start) * 1000
+        self.laps.append(("work", work))
+        for section, value in self.laps:
+            key = (name, section)
+            if key not in self.series:
+                self.series[key] = TimingSeries(self.window)
+            self.series[key].add(value)
+        self.laps.clear()
+
+        self.frames[name] = self.frames.get(name, 0) + 1
+        if work > self.budget:
+            self.missed[name] = self.missed.get(name, 0) + 1
+
+    def summary(self):
+        rows = []
+        for (scene, section), series in sorted(self.series.items()):
+            row = {"scene": scene, "section": section}
+            row.update(series.summary())
+            rows.append(row)
+        return rows
+
+    def export(self, path):
+        # CSV gets one row per (scene, section); JSON also gets histograms
+        if path.endswith(".csv"):
+            rows = self.summary()
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["scene", "section"])
+                writer.writeheader()
+                writer.writerows(rows)
+            return
+
+        data = {
+            "budget_ms": self.budget,
+            "scenes": {
+                scene: {"frames": frames, "missed_deadlines": self.missed.get(scene, 0)}
+                for scene, frames in self.frames.items()
+            },
+            "sections": self.summary(),
+            "histogram_edges_ms": [float(edge) for edge in HISTOGRAM_EDGES[:-1]],
+            "histograms": {
+                f"{scene}/{section}": series.histogram.tolist()
+                for (scene, section), series in self.series.items()
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def overlay_rect(self):
+        if not self.overlay or self.overlay_surface is None:
+            return None
+        return self.overlay_surface.get_rect(topleft=(5, 5))
+
+    def draw_overlay(self, screen, font, scene):
+        if not self.overlay:
+            return
+        name = type(scene).__name__
+        if self.overlay_surface is None or self.frames.get(name, 0) % OVERLAY_REFRESH == 0:
+            self.overlay_surface = self.render_overlay(font, name)
+        screen.blit(self.overlay_surface, (5, 5))
+
+    def render_overlay(self, font, name):
+        lines = [f"{name}  missed {self.missed.get(name, 0)}/{self.frames.get(name, 0)}"]
+        for section in SECTIONS:
+            series = self.series.get((name, section))
+            if series is None:
+                continue
+            s = series.summary()
+            lines.append(f"{section:<8} p50 {s['p50_ms']:5.2f}  p95 {s['p95_ms']:5.2f}  p99 {s['p99_ms']:5.2f} ms")
+
+        line_height = font.get_linesize()
+        width = max(font.size(line)[0] for line in lines) + 10
+        surface = pygame.Surface((width, line_height * len(lines) + 10), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 180))
+        for i, line in enumerate(lines):
+            surface.blit(font.render(line, True, (0, 255, 0)), (5, 5 + i * line_height))
+        return surface
@@ -0,0 +1,95 @@
+# Input-to-photon latency.
+# main() stamps the time it polls events (begin_frame), tags every key press
+# that changes what is on screen with an action label (press), and closes
+# all open tags once the frame showing their result has been flipped
+# (presented). Two latencies are kept per press:
+#
+#   "from_poll": from the poll that picked the key up to the flip. This is
+#       what the game itself adds (event handling, update, draw, flip).
+#   "from_previous_poll": from the poll before it, an upper bound on when
+#       the key actually arrived, since events sit in SDL's queue while the
+#       loop sleeps between frames.
+#
+# Battle turn delays go through the TurnScheduler and never block the loop,
+# so they don't distort these numbers; a selected action shows up (menu
+# hidden, new message) on the very next flip.
+import csv
+import json
+import time
+
+from frame_stats import HISTOGRAM_EDGES, TimingSeries
+
+class LatencyTracker:
+    def __init__(self, enabled=False, window=600):
+        self.enabled = enabled
+        self.window = window
+        self.series = {}
+        self.poll_time = None
+        self.previous_poll_time = None
+        self.pending = []
+
+    def begin_frame(self):
+        # Call right before polling events
+        if not self.enabled:
+            return
+        self.previous_poll_time = self.poll_time
+        self.poll_time = time.perf_counter()
+
+    def press(self, action):
+        # A key press handled this frame whose result the next flip shows
+        if not self.enabled or self.poll_time is None:
+            return
+        self.pending.append((action, self.poll_time, self.previous_poll_time or self.poll_time))
+
+    def presented(self):
+        # Call right after the display was flipped
+        if not self.enabled or not self.pending:
+            return
+        now = time.perf_counter()
+        for action, poll_time, previous_poll_time in self.pending:
+            self.add(action, "from_poll", (now - poll_time) * 1000)
+            self.add(action, "from_previous_poll", (now - previous_poll_time) * 1000)
+        self.pending.clear()
+
+    def add(self, action, kind, value):
+        key = (action, kind)
+        if key not in self.series:
+            self.series[key] = TimingSeries(self.window)
+        self.series[key].add(value)
+
+    def summary(self):
+        rows = []
+        for (action, kind), series in sorted(self.series.items()):
+            row = {"action": action, "latency": kind}
+            row.update(series.summary())
+            rows.append(row)
+        return rows
+
+    def report(self):
+        # Plain-text table of the summary
+        lines = [f"{'action':<16}{'latency':<20}{'count':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}  ms"]
+        for row in self.summary():
+            lines.append(f"{row['action']:<16}{row['latency']:<20}{row['count']:>7}{row['p50_ms']:8.2f}"
+                         f"{row['p95_ms']:8.2f}{row['p99_ms']:8.2f}{row['max_ms']:8.2f}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        # CSV gets one row per (action, latency); JSON also gets histograms
+        if path.endswith(".csv"):
+            rows = self.summary()
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["action", "latency"])
+                writer.writeheader()
+                writer.writerows(rows)
+            return
+
+        data = {
+            "actions": self.summary(),
+            "histogram_edges_ms": [float(edge) for edge in HISTOGRAM_EDGES[:-1]],
+            "histograms": {
+                f"{action}/{kind}": series.histogram.tolist()
+                for (action, kind), series in self.series.items()
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
@@ -0,0 +1,104 @@
+# Streaming music.
+# Instead of synthesizing a whole track up front and looping it, a
+# NoteStream renders (frequency, duration) note lists a small chunk at a
+# time, and MusicPlayer keeps a reserved mixer channel fed from a worker
+# thread with Channel.queue, converting chunks to the mixer's format.
+# Memory stays at a couple of chunks whatever the track length, nothing is
+# rendered before the first chunk plays, and the track can be switched at
+# any time.
+import threading
+
+import numpy as np
+import pygame
+
+import synth
+from audio_cache import SAMPLE_RATE
+
+# Length of each queued chunk; the channel holds one playing and one queued
+CHUNK_DURATION = 0.1
+
+class NoteStream:
+    # The same waveform as audio_cache.synthesize_melody, read in pieces
+    def __init__(self, notes, harmonic=0.0, volume=0.5, sample_rate=SAMPLE_RATE, loop=True):
+        self.notes = list(notes)
+        self.lengths = [int(sample_rate * duration) for _, duration in self.notes]
+        self.harmonic = harmonic
+        self.volume = volume
+        self.sample_rate = sample_rate
+        self.loop = loop
+        self.note = 0
+        self.offset = 0
+
+    def read(self, count):
+        # Up to `count` int16 samples; fewer (possibly none) once a
+        # non-looping stream runs out
+        out = np.empty(count, dtype=np.int16)
+        filled = 0
+        while filled < count:
+            if self.note == len(self.notes):
+                if not self.loop or not self.notes:
+                    return out[:filled]
+                self.note = 0
+
+            frequency = self.notes[self.note][0]
+            take = min(count - filled, self.lengths[self.note] - self.offset)
+            t = np.arange(self.offset, self.offset + take) / self.sample_rate
+            wave = np.sin(frequency * t * 2 * np.pi)
+            if self.harmonic:
+                wave += np.sin(2 * frequency * t * 2 * np.pi) * self.harmonic
+            out[filled:filled + take] = wave * 32767 * self.volume
+
+            filled += take
+            self.offset += take
+            if self.offset == self.lengths[self.note]:
+                self.note += 1
+                self.offset = 0
+        return out
+
+class MusicPlayer:
+    def __init__(self, channel, chunk_duration=CHUNK_DURATION, sample_rate=None):
+        self.channel = channel
+        self.chunk_size = int((sample_rate or synth.mixer_format()[0]) * chunk_duration)
+        self.poll_interval = chunk_duration / 4
+        self.stream = None
+        self.closed = False
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="music", daemon=True)
+        self.thread.start()
+
+    def play(self, stream):
+        # Switch to a new NoteStream straight away
+        with self.lock:
+            self.stream = stream
+            self.channel.stop()
+        self.wake.set()
+
+    def stop(self):
+        with self.lock:
+            self.stream = None
+            self.channel.stop()
+
+    def run(self):
+        while not self.closed:
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+            with self.lock:
+                if self.stream is None or self.channel.get_queue() is not None:
+                    continue
+                chunk = self.stream.read(self.chunk_size)
+                if len(chunk) == 0:
+                    self.stream = None
+                    continue
+                try:
+                    # An idle channel starts a queued sound immediately
+                    self.channel.queue(synth.make_sound(chunk))
+                except pygame.error:
+                    # The mixer was shut down under us
+                    return
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.thread.join()
+        self.stop()
@@ -0,0 +1,116 @@
+# Pre-rendered parallax star layers shared by every scene.
+# A few tileable layers of stars (LAYERS, far to near) are rendered once per
+# screen size to off-screen surfaces. A scene's background then only blits
+# each layer at its own scrolled offset, four tiles per layer where it wraps,
+# over the cleared frame. The layers are colorkeyed and run-length encoded,
+# so the empty sky between stars costs next to nothing: a frame's background
+# is a dozen cheap blits whatever the star density, and the nearer layers
+# moving faster gives the field depth.
+import numpy as np
+import pygame
+
+BLACK = (0, 0, 0)
+
+# Far to near: star count, radii (0 is a single pixel), color and speed as
+# a fraction of the scene's speed
+LAYERS = [
+    {"stars": 300, "sizes": (0,), "color": (110, 110, 140), "speed": 0.2},
+    {"stars": 100, "sizes": (0, 1), "color": (180, 180, 210), "speed": 0.5},
+    {"stars": 40, "sizes": (1, 2), "color": (255, 255, 255), "speed": 1.0},
+]
+
+# The same sky every run
+LAYER_SEED = 7
+
+# Radians per step the "swirl" drift turns by
+SWIRL_RATE = 0.002
+
+# Rendered layer surfaces by screen size
+_layers = {}
+
+def render_layer(layer, size, rng):
+    # One tileable layer: stars near an edge are drawn again on the other side
+    width, height = size
+    surface = pygame.Surface(size)
+    surface.fill(BLACK)
+    xs = rng.integers(0, width, layer["stars"])
+    ys = rng.integers(0, height, layer["stars"])
+    radii = rng.choice(layer["sizes"], layer["stars"])
+    for x, y, radius in zip(xs, ys, radii):
+        for dx in (-width, 0, width):
+            for dy in (-height, 0, height):
+                if radius == 0:
+                    if dx == dy == 0:
+                        surface.set_at((int(x), int(y)), layer["color"])
+                else:
+                    pygame.draw.circle(surface, layer["color"], (int(x + dx), int(y + dy)), int(radius))
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+    surface.set_colorkey(BLACK, pygame.RLEACCEL)
+    return surface
+
+def get_layers(size):
+    # The layer surfaces for a screen size, rendered on first use
+    size = tuple(size)
+    if size not in _layers:
+        rng = np.random.default_rng(LAYER_SEED)
+        _layers[size] = [render_layer(layer, size, rng) for layer in LAYERS]
+    return _layers[size]
+
+class ParallaxBackground:
+    # motion is "down" (the sky scrolls down), "left" (it drifts left) or
+    # "swirl" (a slow drift whose direction keeps turning); speed is how
+    # far the nearest layer moves per update, in pixels
+    def __init__(self, speed, motion="down", area=(800, 600)):
+        self.speed = speed
+        self.motion = motion
+        self.width, self.height = area
+        self.layers = get_layers(area)
+        self.factors = np.array([layer["speed"] for layer in LAYERS])
+        self.offsets = np.zeros((len(LAYERS), 2))
+        self.prev_offsets = self.offsets.copy()
+        self.steps = 0
+
+        # Whole-pixel offsets of the last two draws, for dirty rects
+        self.drawn = None
+        self.last_drawn = None
+
+    def velocity(self):
+        if self.motion == "down":
+            return 0.0, self.speed
+        if self.motion == "left":
+            return -self.speed, 0.0
+        angle = self.steps * SWIRL_RATE
+        return self.speed * np.cos(angle), self.speed * np.sin(angle)
+
+    def update(self):
+        self.prev_offsets[:] = self.offsets
+        self.offsets += np.outer(self.factors, self.velocity())
+        self.offsets %= (self.width, self.height)
+        self.steps += 1
+
+    def positions(self, alpha=1.0):
+        # Layer offsets alpha of the way from the previous update to the last
+        if alpha >= 1:
+            return self.offsets.astype(int)
+        size = np.array([self.width, self.height])
+        delta = self.offsets - self.prev_offsets
+        delta -= size * np.round(delta / size)
+        return ((self.prev_offsets + delta * alpha) % size).astype(int)
+
+    def draw(self, screen, alpha=1.0):
+        offsets = self.positions(alpha)
+        self.last_drawn = self.drawn
+        self.drawn = offsets
+        tiles = []
+        for surface, (x, y) in zip(self.layers, offsets):
+            for tile_x in (x - self.width, x):
+                for tile_y in (y - self.height, y):
+                    tiles.append((surface, (tile_x, tile_y)))
+        screen.blits(tiles, doreturn=False)
+
+    def dirty_rects(self):
+        # Everything moves when any layer does; nothing otherwise
+        if self.last_drawn is not None and (self.drawn == self.last_drawn).all():
+            return []
+        return [pygame.Rect(0, 0, self.width, self.height)]
@@ -0,0 +1,221 @@
+# Particle effects for combat feedback.
+# Particles are columns of one NumPy array, one row per field (position,
+# velocity, age, lifetime, drag, pull towards a point, color, size), with
+# the live ones packed at the front. Updating tens of thousands of them is a
+# handful of whole-array operations, and drawing writes them all into a
+# layer in bulk and lightens the frame with it in one blit; there is no
+# Python object per particle.
+#
+# Bursts come from the named effects in EFFECTS:
+#
+#   burst:  particles fly out of the origin in every direction
+#   infall: particles start on a ring around the origin, swirl and are
+#           pulled in, vanishing once they reach it
+import numpy as np
+import pygame
+
+import random_streams
+from stamps import stamp_offsets
+
+# Most particles alive at once; bursts beyond it are cut short
+CAPACITY = 65536
+
+# Rows of ParticleSystem.data
+FIELDS = ("x", "y", "vx", "vy", "age", "life", "drag", "pull", "tx", "ty", "r", "g", "b", "size")
+X, Y, VX, VY, AGE, LIFE, DRAG, PULL, TX, TY, R, G, B, SIZE = range(len(FIELDS))
+
+# Infall particles closer than this to their target are gone
+CAPTURE_RADIUS = 4
+EFFECTS = {
+    # Player actions
+    "blast": {"shape": "burst", "count": 600, "speed": (1.5, 6.0), "life": (15, 40), "drag": 0.93,
+              "colors": [(255, 255, 0), (255, 165, 0), (255, 255, 255)], "sizes": (0, 1)},
+    "fission": {"shape": "burst", "count": 2000, "speed": (2.0, 10.0), "life": (25, 60), "drag": 0.95,
+                "colors": [(0, 191, 255), (128, 255, 255), (255, 255, 255)], "sizes": (0, 1)},
+    "fusion": {"shape": "infall", "count": 1200, "radius": (60, 160), "speed": (0.5, 2.0), "pull": 0.35,
+               "life": (40, 80), "drag": 0.96, "colors": [(255, 255, 0), (0, 255, 0), (255, 255, 255)],
+               "sizes": (0, 1)},
+
+    # Enemy actions; "hit" takes the enemy's color
+    "hit": {"shape": "burst", "count": 400, "speed": (1.0, 5.0), "life": (15, 35), "drag": 0.92,
+            "colors": [(255, 255, 255)], "sizes": (0, 1)},
+    "heal": {"shape": "infall", "count": 800, "radius": (50, 120), "speed": (0.5, 1.5), "pull": 0.3,
+             "life": (40, 70), "drag": 0.95, "colors": [(0, 255, 0), (128, 255, 128)], "sizes": (0,)},
+    "supernova": {"shape": "burst", "count": 12000, "speed": (1.0, 14.0), "life": (40, 100), "drag": 0.97,
+                  "colors": [(255, 69, 0), (255, 165, 0), (255, 255, 0), (255, 255, 255)],
+                  "sizes": (0, 1, 2)},
+    "black_hole": {"shape": "infall", "count": 8000, "radius": (80, 420), "speed": (1.0, 4.0), "pull": 0.5,
+                   "life": (60, 140), "drag": 0.98, "colors": [(128, 0, 128), (138, 43, 226), (255, 255, 255)],
+                   "sizes": (0, 1)},
+}
+
+def particle_offsets(size):
+    # (dx, dy) pixel offsets of a particle; size 0 is a single pixel
+    if size == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    return stamp_offsets(size)
+
+class ParticleSystem:
+    def __init__(self, capacity=CAPACITY, rng=None):
+        self.rng = rng if rng is not None else random_streams.numpy_stream("particles")
+        self.data = np.zeros((len(FIELDS), capacity), dtype=np.float32)
+        self.count = 0
+
+        # Screen-sized surface 32-bit draws write particles into
+        self.layer = None
+
+        # Areas covered by the last two draws, for dirty rects
+        self.bounds = None
+        self.last_bounds = None
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def spawn(self, name, origin, colors=None):
+        # Start effect `name` at origin; colors replaces the effect's palette.
+        # Returns how many particles were spawned.
+        effect = EFFECTS[name]
+        count = min(effect["count"], self.data.shape[1] - self.count)
+        if count <= 0:
+            return 0
+        rng = self.rng
+        block = self.data[:, self.count:self.count + count]
+        ox, oy = origin
+
+        angle = rng.uniform(0, 2 * np.pi, count)
+        speed = rng.uniform(*effect["speed"], count)
+        if effect["shape"] == "burst":
+            block[X] = ox
+            block[Y] = oy
+            block[VX] = np.cos(angle) * speed
+            block[VY] = np.sin(angle) * speed
+            block[PULL] = 0
+        else:
+            # Start on a ring and move along it, so the pull makes a swirl
+            radius = rng.uniform(*effect["radius"], count)
+            block[X] = ox + np.cos(angle) * radius
+            block[Y] = oy + np.sin(angle) * radius
+            block[VX] = -np.sin(angle) * speed
+            block[VY] = np.cos(angle) * speed
+            block[PULL] = effect["pull"]
+
+        block[TX] = ox
+        block[TY] = oy
+        block[AGE] = 0
+        block[LIFE] = rng.integers(effect["life"][0], effect["life"][1] + 1, count)
+        block[DRAG] = effect["drag"]
+        palette = np.array(colors or effect["colors"], dtype=np.float32)
+        block[R:B + 1] = palette[rng.integers(0, len(palette), count)].T
+        block[SIZE] = rng.choice(effect["sizes"], count)
+
+        self.count += count
+        return count
+
+    def update(self):
+        # One simulation step for every live particle
+        if self.count == 0:
+            return
+        live = self.data[:, :self.count]
+
+        # Pull towards the target, falling off with distance
+        dx = live[TX] - live[X]
+        dy = live[TY] - live[Y]
+        distance = np.hypot(dx, dy)
+        pulled = live[PULL] / (distance + 1)
+        live[VX] += dx * pulled
+        live[VY] += dy * pulled
+
+        live[VX] *= live[DRAG]
+        live[VY] *= live[DRAG]
+        live[X] += live[VX]
+        live[Y] += live[VY]
+        live[AGE] += 1
+
+        # Keep the survivors packed at the front: the live particles past
+        # the new end fill the holes left by dead ones before it, so only
+        # as many particles move as died
+        alive = live[AGE] < live[LIFE]
+        alive &= (live[PULL] == 0) | (distance > CAPTURE_RADIUS)
+        count = np.count_nonzero(alive)
+        if count < self.count:
+            holes = np.flatnonzero(~alive[:count])
+            movers = np.flatnonzero(alive[count:]) + count
+            live[:, holes] = live[:, movers]
+            self.count = count
+
+    def draw(self, screen, alpha=1.0):
+        # Particles alpha of the way between their last two steps, fading
+        # out over their lifetime and lightening whatever is underneath
+        self.last_bounds = self.bounds
+        self.bounds = None
+        if self.count == 0:
+            return
+        live = self.data[:, :self.count]
+        behind = 1 - alpha
+        x = (live[X] - live[VX] * behind).astype(np.int32)
+        y = (live[Y] - live[VY] * behind).astype(np.int32)
+        fade = 1 - live[AGE] / live[LIFE]
+        colors = (live[R:B + 1] * fade).astype(np.uint32)
+        sizes = live[SIZE]
+
+        margin = int(sizes.max()) + 1
+        bounds = pygame.Rect(int(x.min()) - margin, int(y.min()) - margin,
+                             int(x.max() - x.min()) + margin * 2 + 1, int(y.max() - y.min()) + margin * 2 + 1)
+        self.bounds = bounds.clip(screen.get_rect())
+
+        if screen.get_bytesize() == 4:
+            self._draw_mapped(screen, x, y, colors, sizes, self.bounds)
+        else:
+            self._draw_rgb(screen, x, y, colors.T.astype(np.uint8), sizes)
+
+    def stamps(self, x, y, sizes, width, height):
+        # (particles, dx, dy) per particle size: the particles whose whole
+        # stamp is on screen and the stamp's pixel offsets
+        for size in np.flatnonzero(np.bincount(sizes.astype(np.intp))):
+            selected = np.flatnonzero(sizes == size)
+            xs = x[selected]
+            ys = y[selected]
+            inside = (xs >= size) & (xs < width - size) & (ys >= size) & (ys < height - size)
+            yield selected[inside], *particle_offsets(size)
+
+    def _draw_mapped(self, screen, x, y, colors, sizes, bounds):
+        # 32-bit surfaces: particles are written as whole words, through a
+        # flat view, into a cleared layer, and one BLEND_RGB_MAX blit over
+        # their bounds lightens the frame with it. Nothing is read back;
+        # where particles overlap, the one written last shows. Each stamp
+        # pixel is one pass over the particles of that size, which scatters
+        # much faster than a single 2D fancy index.
+        if self.layer is None or self.layer.get_size() != screen.get_size():
+            self.layer = pygame.Surface(screen.get_size(), 0, screen)
+        layer = self.layer
+        layer.fill(0, bounds)
+        red, green, blue = layer.get_shifts()[:3]
+        mapped = (colors[0] << red) | (colors[1] << green) | (colors[2] << blue)
+        width, height = layer.get_size()
+        pitch = layer.get_pitch() // 4
+        pixels = pygame.surfarray.pixels2d(layer)
+        flat = np.lib.stride_tricks.as_strided(pixels, shape=(pitch * height,), strides=(4,))
+        for selected, dx, dy in self.stamps(x, y, sizes, width, height):
+            index = y[selected].astype(np.intp) * pitch + x[selected]
+            values = mapped[selected]
+            for offset in dy * pitch + dx:
+                flat[index + offset] = values
+        del flat, pixels
+        screen.blit(layer, bounds, bounds, special_flags=pygame.BLEND_RGB_MAX)
+
+    def _draw_rgb(self, screen, x, y, colors, sizes):
+        # Other depths go through the slower 3D pixel view
+        width, height = screen.get_size()
+        pixels = pygame.surfarray.pixels3d(screen)
+        for selected, dx, dy in self.stamps(x, y, sizes, width, height):
+            xs = x[selected][:, None] + dx
+            ys = y[selected][:, None] + dy
+            pixels[xs, ys] = np.maximum(pixels[xs, ys], colors[selected][:, None])
+        del pixels
+
+    def dirty_rects(self):
+        # Where particles were drawn this frame and the one before
+        return [rect.copy() for rect in (self.last_bounds, self.bounds) if rect]
@@ -0,0 +1,41 @@
+# Seedable random number streams.
+# Every consumer of randomness asks for a named stream ("battle", "stars",
+# ...) instead of using the global random / np.random state, so a whole run
+# can be reproduced from one seed and streams don't disturb each other.
+import random
+import zlib
+
+import numpy as np
+
+class RandomStreams:
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(1 << 63)
+        self.python_streams = {}
+        self.numpy_streams = {}
+
+    def python(self, name):
+        # random.Random for the named stream, created on first use
+        if name not in self.python_streams:
+            self.python_streams[name] = random.Random(f"{self.seed}:{name}")
+        return self.python_streams[name]
+
+    def numpy(self, name):
+        # np.random.Generator for the named stream, created on first use
+        if name not in self.numpy_streams:
+            self.numpy_streams[name] = np.random.default_rng([self.seed, zlib.crc32(name.encode())])
+        return self.numpy_streams[name]
+
+# Streams used when nothing is injected
+default_streams = RandomStreams()
+
+def seed(value):
+    # Reset the default streams, e.g. before recording or replaying a run
+    global default_streams
+    default_streams = RandomStreams(value)
+    return default_streams
+
+def python_stream(name):
+    return default_streams.python(name)
+
+def numpy_stream(name):
+    return default_streams.numpy(name)
@@ -0,0 +1,60 @@
+# Input recording and replay.
+# A log holds the RNG seed of the run and every KEYDOWN (plus the final
+# QUIT) with the frame it was handled on, packed into fixed-size records:
+#
+#   header: b"SVRP", format version (u16), seed (u64)
+#   record: frame (u32), key (i32), mod (u16), unicode code point (u32)
+#
+# Replaying feeds the same events on the same frames, so with the same seed
+# the game plays out identically, with or without a display.
+import struct
+
+import pygame
+
+MAGIC = b"SVRP"
+VERSION = 1
+HEADER = struct.Struct("<4sHQ")
+RECORD = struct.Struct("<IiHI")
+
+# Key value used to record the end of the session
+QUIT_KEY = -1
+
+class InputRecorder:
+    def __init__(self, path, seed):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed))
+
+    def record(self, frame, event):
+        if event.type == pygame.KEYDOWN:
+            code_point = ord(event.unicode) if len(event.unicode) == 1 else 0
+            self.file.write(RECORD.pack(frame, event.key, event.mod & 0xFFFF, code_point))
+        elif event.type == pygame.QUIT:
+            self.file.write(RECORD.pack(frame, QUIT_KEY, 0, 0))
+
+    def close(self):
+        self.file.close()
+
+class InputReplay:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+
+        magic, version, self.seed = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} Sun Voyage replay")
+
+        self.records = list(RECORD.iter_unpack(data[HEADER.size:]))
+        self.position = 0
+
+    def events(self, frame):
+        # Events recorded for this frame, rebuilt as pygame events
+        events = []
+        while self.position < len(self.records) and self.records[self.position][0] <= frame:
+            _, key, mod, code_point = self.records[self.position]
+            self.position += 1
+            if key == QUIT_KEY:
+                events.append(pygame.event.Event(pygame.QUIT))
+            else:
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod,
+                                                 unicode=chr(code_point) if code_point else ""))
+        return events
@@ -0,0 +1,157 @@
+# Campaign save files.
+# A save holds the player's name and a battle_engine.BattleSnapshot (player
+# stats, current enemy, battle state and turn, RNG state) packed into a few
+# fixed-size records:
+#
+#   header:  b"SVSG", format version (u16), name length (u16), name (UTF-8)
+#   player:  health, max health, power, defense, level, experience,
+#            experience to next level, victories (i32 each)
+#   battle:  enemy type (i8, -1 for none), enemy level (i32), enemy health
+#            (i32), state (u8), turn (u32)
+#   rng:     present (u8), then Mersenne Twister words (625 x u32) and
+#            gauss_next (u8 flag, f64)
+#
+# Packing and unpacking take microseconds. Autosaver writes on a background
+# thread, through disk_cache.write_atomic, so a save never stalls a frame
+# and a crash mid-write never leaves a broken file behind.
+import os
+import struct
+import threading
+
+from battle_engine import BattleSnapshot
+from disk_cache import write_atomic
+
+MAGIC = b"SVSG"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+PLAYER = struct.Struct("<8i")
+BATTLE = struct.Struct("<biiBI")
+RNG_FLAG = struct.Struct("<B")
+RNG_WORDS = struct.Struct("<625I")
+RNG_GAUSS = struct.Struct("<Bd")
+
+# Battle states by their saved code
+STATES = ("player_turn", "enemy_turn", "win", "lose")
+
+def pack_campaign(battle):
+    # Bytes for the campaign in a battle_engine.Battle (or BattleSystem)
+    snapshot = battle.snapshot()
+    name = battle.player.name.encode()
+    parts = [
+        HEADER.pack(MAGIC, VERSION, len(name)), name,
+        PLAYER.pack(snapshot.player_health, snapshot.player_max_health, snapshot.player_power,
+                    snapshot.player_defense, snapshot.player_level, snapshot.player_experience,
+                    snapshot.player_exp_to_next_level, snapshot.player_victories),
+        BATTLE.pack(snapshot.enemy_type, snapshot.enemy_level if snapshot.enemy_type >= 0 else 0,
+                    snapshot.enemy_health if snapshot.enemy_type >= 0 else 0,
+                    STATES.index(snapshot.state), snapshot.turn),
+    ]
+
+    # Only random.Random's version 3 state fits the fixed layout
+    rng_state = snapshot.rng_state
+    if rng_state is not None and rng_state[0] == 3:
+        gauss = rng_state[2]
+        parts += [RNG_FLAG.pack(1), RNG_WORDS.pack(*rng_state[1]),
+                  RNG_GAUSS.pack(gauss is not None, gauss or 0.0)]
+    else:
+        parts.append(RNG_FLAG.pack(0))
+    return b"".join(parts)
+
+def unpack_campaign(data):
+    # (player name, BattleSnapshot) from bytes written by pack_campaign
+    magic, version, name_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} Sun Voyage save")
+    offset = HEADER.size
+    name = data[offset:offset + name_length].decode()
+    offset += name_length
+
+    snapshot = BattleSnapshot()
+    (snapshot.player_health, snapshot.player_max_health, snapshot.player_power,
+     snapshot.player_defense, snapshot.player_level, snapshot.player_experience,
+     snapshot.player_exp_to_next_level, snapshot.player_victories) = PLAYER.unpack_from(data, offset)
+    offset += PLAYER.size
+
+    enemy_type, enemy_level, enemy_health, state, snapshot.turn = BATTLE.unpack_from(data, offset)
+    offset += BATTLE.size
+    snapshot.enemy_type = enemy_type
+    snapshot.enemy_level = enemy_level
+    snapshot.enemy_health = enemy_health
+    snapshot.state = STATES[state]
+    snapshot.last_action = None
+    if enemy_type >= 0 and snapshot.state in ("player_turn", "enemy_turn"):
+        snapshot.message = "The battle resumes!"
+    else:
+        snapshot.message = ""
+
+    (has_rng,) = RNG_FLAG.unpack_from(data, offset)
+    offset += RNG_FLAG.size
+    snapshot.rng_state = None
+    if has_rng:
+        words = RNG_WORDS.unpack_from(data, offset)
+        offset += RNG_WORDS.size
+        has_gauss, gauss = RNG_GAUSS.unpack_from(data, offset)
+        snapshot.rng_state = (3, words, gauss if has_gauss else None)
+    return name, snapshot
+
+def save_campaign(path, battle):
+    write_atomic(path, pack_campaign(battle))
+
+def load_campaign(path):
+    # (player name, BattleSnapshot), or None when there is no usable save
+    try:
+        with open(path, "rb") as f:
+            return unpack_campaign(f.read())
+    except (OSError, ValueError, struct.error, UnicodeDecodeError, IndexError):
+        return None
+
+class Autosaver:
+    # Writes saves on a background thread. The campaign is packed on the
+    # caller's thread (microseconds); if saves come in faster than the disk
+    # keeps up, only the newest is written.
+    def __init__(self, path):
+        self.path = path
+        self.pending = None
+        self.last = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def save(self, battle):
+        self.submit(pack_campaign(battle))
+
+    def clear(self):
+        # Remove the save, e.g. once the campaign is over
+        if self.last != b"":
+            self.submit(b"")
+
+    def submit(self, data):
+        self.last = data
+        with self.condition:
+            self.pending = data
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                data, self.pending = self.pending, None
+            try:
+                if data:
+                    write_atomic(self.path, data)
+                elif os.path.exists(self.path):
+                    os.remove(self.path)
+            except OSError:
+                # A failed autosave only costs the progress since the last one
+                pass
+
+    def close(self):
+        # Finish any pending write and stop the thread
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
@@ -0,0 +1,40 @@
+# Timed turn scheduler.
+# Keeps a queue of pending callbacks with due times and runs them from the
+# game loop, so pauses between battle turns never block rendering or input.
+import heapq
+import time
+
+def _milliseconds():
+    return time.perf_counter() * 1000
+
+class TurnScheduler:
+    # time_source returns the current time in milliseconds (for example
+    # pygame.time.get_ticks). time_scale stretches every delay: 0.5 plays
+    # turns twice as fast, 0 makes them due on the next update.
+    def __init__(self, time_source=_milliseconds, time_scale=1.0):
+        self.time_source = time_source
+        self.time_scale = time_scale
+        self.queue = []
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, delay, callback, *args):
+        # Run callback(*args) once delay milliseconds have passed
+        due = self.time_source() + delay * self.time_scale
+        heapq.heappush(self.queue, (due, self.counter, callback, args))
+        self.counter += 1
+
+    def update(self):
+        # Run every callback that is due, in order; returns how many ran
+        now = self.time_source()
+        ran = 0
+        while self.queue and self.queue[0][0] <= now:
+            _, _, callback, args = heapq.heappop(self.queue)
+            callback(*args)
+            ran += 1
+        return ran
+
+    def clear(self):
+        self.queue.clear()
@@ -0,0 +1,27 @@
+# Round stamps for stars and particles.
+# The pixels pygame.draw.circle fills for a radius, either as a small
+# colorkeyed surface or as (dx, dy) offset arrays for writing many stamps
+# into a pixel array at once.
+import numpy as np
+import pygame
+
+WHITE = (255, 255, 255)
+
+# Pixel offsets covered by pygame.draw.circle for each radius
+_stamp_offsets = {}
+
+def make_stamp(size, color):
+    stamp = pygame.Surface((size * 2 + 1, size * 2 + 1))
+    stamp.set_colorkey((0, 0, 0) if color != (0, 0, 0) else (255, 255, 255))
+    stamp.fill(stamp.get_colorkey())
+    pygame.draw.circle(stamp, color, (size, size), size)
+    return stamp
+
+def stamp_offsets(size):
+    # (dx, dy) arrays of the pixels pygame.draw.circle fills for a radius
+    if size not in _stamp_offsets:
+        stamp = make_stamp(size, WHITE)
+        mask = pygame.surfarray.array2d(stamp) != stamp.map_rgb(stamp.get_colorkey())
+        dx, dy = np.nonzero(mask)
+        _stamp_offsets[size] = (dx - size, dy - size)
+    return _stamp_offsets[size]
@@ -0,0 +1,139 @@
+# Array-backed starfield, the scenes' background under dirty-rect rendering.
+# Star positions live in NumPy arrays and are moved with whole-array
+# operations; drawing writes every star into the frame in one bulk step.
+# Stars can be drawn part of the way between their last two updates (alpha),
+# for rendering between fixed simulation steps, and only the grid cells the
+# stars pass through are reported dirty.
+import numpy as np
+import pygame
+
+import random_streams
+from stamps import make_stamp, stamp_offsets
+
+WHITE = (255, 255, 255)
+
+# Cell size used to report changed regions for dirty-rect rendering
+DIRTY_CELL = 32
+
+# Pre-rendered star stamps for surfaces that can't be accessed as arrays
+_stamp_surfaces = {}
+
+class Starfield:
+    # motion is "down" (stars fall and wrap to the top), "left" (stars
+    # drift left and wrap to the right edge) or "swirl" (the ending screen's
+    # curved drift, respawning anywhere once a star leaves the screen)
+    def __init__(self, count, speed_range, motion="down", area=(800, 600), rng=None):
+        self.rng = rng if rng is not None else random_streams.numpy_stream("stars")
+        self.width, self.height = area
+        self.motion = motion
+        self.x = self.rng.integers(0, self.width + 1, count).astype(np.float64)
+        self.y = self.rng.integers(0, self.height + 1, count).astype(np.float64)
+        self.speed = self.rng.uniform(speed_range[0], speed_range[1], count)
+        self.size = self.rng.integers(1, 4, count)
+        self.prev_x = self.x.copy()
+        self.prev_y = self.y.copy()
+        self.wrapped = np.zeros(count, dtype=bool)
+
+        # Positions of the last two draws, for dirty rects
+        self.drawn = None
+        self.last_drawn = None
+
+    def __len__(self):
+        return len(self.x)
+
+    def update(self):
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+
+        if self.motion == "down":
+            self.y += self.speed
+            wrapped = self.y > self.height
+            self.y[wrapped] = 0
+            self.x[wrapped] = self.rng.integers(0, self.width + 1, np.count_nonzero(wrapped))
+            self.wrapped = wrapped
+
+        elif self.motion == "left":
+            self.x -= self.speed
+            wrapped = self.x < 0
+            self.x[wrapped] = self.width
+            self.y[wrapped] = self.rng.integers(0, self.height + 1, np.count_nonzero(wrapped))
+            self.wrapped = wrapped
+
+        elif self.motion == "swirl":
+            self.x += self.speed * np.cos(self.y * 0.01)
+            self.y += self.speed * np.sin(self.x * 0.01)
+            wrapped = (self.y < 0) | (self.y > self.height) | (self.x < 0) | (self.x > self.width)
+            count = np.count_nonzero(wrapped)
+            self.x[wrapped] = self.rng.integers(0, self.width + 1, count)
+            self.y[wrapped] = self.rng.integers(0, self.height + 1, count)
+            self.wrapped = wrapped
+
+    def positions(self, alpha=1.0):
+        # Star positions alpha of the way from the previous update to the
+        # last; wrapped stars are drawn at their new place straight away
+        if alpha >= 1:
+            return self.x.copy(), self.y.copy()
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        x[self.wrapped] = self.x[self.wrapped]
+        y[self.wrapped] = self.y[self.wrapped]
+        return x, y
+
+    def dirty_rects(self):
+        # Grid cells touched by any star where it was last drawn and where
+        # it was drawn before that (its last two positions if it hasn't been
+        # drawn), so the number of rects stays bounded however many stars
+        # there are
+        columns = self.width // DIRTY_CELL + 1
+        cells = []
+        if self.drawn is None:
+            positions = ((self.prev_x, self.prev_y), (self.x, self.y))
+        else:
+            positions = [p for p in (self.last_drawn, self.drawn) if p is not None]
+        for x, y in positions:
+            x = x.astype(np.int64)
+            y = y.astype(np.int64)
+            for dx in (-self.size, self.size):
+                for dy in (-self.size, self.size):
+                    cells.append(((y + dy) // DIRTY_CELL) * columns + (x + dx) // DIRTY_CELL)
+
+        rects = []
+        for cell in np.unique(np.concatenate(cells)):
+            row, column = divmod(int(cell), columns)
+            rects.append(pygame.Rect(column * DIRTY_CELL, row * DIRTY_CELL, DIRTY_CELL, DIRTY_CELL))
+        return rects
+
+    def draw(self, screen, color=WHITE, alpha=1.0):
+        x, y = self.positions(alpha)
+        self.last_drawn = self.drawn
+        self.drawn = (x, y)
+        try:
+            pixels = pygame.surfarray.pixels2d(screen)
+        except ValueError:
+            # 24-bit surfaces have no 2D pixel view
+            self._draw_stamps(screen, color, x, y)
+            return
+
+        mapped = screen.map_rgb(color)
+        width, height = pixels.shape
+        x = x.astype(np.int64)
+        y = y.astype(np.int64)
+
+        for size in np.unique(self.size):
+            selected = self.size == size
+            dx, dy = stamp_offsets(int(size))
+            xs = (x[selected][:, None] + dx).ravel()
+            ys = (y[selected][:, None] + dy).ravel()
+            visible = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            pixels[xs[visible], ys[visible]] = mapped
+
+        del pixels
+
+    def _draw_stamps(self, screen, color, x, y):
+        sequence = []
+        for x, y, size in zip(x.astype(int), y.astype(int), self.size):
+            key = (int(size), color)
+            if key not in _stamp_surfaces:
+                _stamp_surfaces[key] = make_stamp(int(size), color)
+            sequence.append((_stamp_surfaces[key], (x - size, y - size)))
+        screen.blits(sequence, doreturn=False)
@@ -1,18 +1,37 @@
 import pygame
 import numpy as np
+import argparse
+import os
 import sys
-import random
 import time
 from pygame import mixer
 
-# Initialize pygame
-pygame.init()
-mixer.init()
+import battle_engine
+import battle_solver
+from caches import text_cache, layout_cache
+from dirty_rects import DirtyRenderer, RegionTracker
+from frame_capture import FrameCapture
+from frame_pacing import FramePacer
+from frame_stats import FrameStats
+from input_latency import LatencyTracker
+import enemy_sprites
+from music_stream import MusicPlayer, NoteStream
+from parallax import ParallaxBackground, get_layers
+from particles import ParticleSystem
+import random_streams
+from replay import InputRecorder, InputReplay
+import save_game
+from scheduler import TurnScheduler
+from starfield import Starfield
+import synth
 
 # Constants
 WIDTH, HEIGHT = 800, 600
 PIXEL_SIZE = 10
-FPS = 60
+FPS = 60  # Simulation steps per second; per-step speeds and timers assume it
+SLOW_FPS = 10  # Enough for slow stars and blinking text
+BATTLE_IDLE_FPS = 20  # Battle stars while the player picks an action
+TURN_DELAY = 500  # Pause between battle turns, in milliseconds
 
 # Colors
 BLACK = (0, 0, 0)
@@ -24,108 +43,161 @@ GREEN = (0, 255, 0)
 PURPLE = (128, 0, 128)
 ORANGE = (255, 165, 0)
 
+# Display, fonts and sounds are created on first use (or by main()), so
+# importing this module stays cheap and needs no display or audio device
+_screen = None
+_fonts = {}
+_sounds = {}
+_music = None
+
+# Set by main() when drawing with dirty rects; see make_background
+_dirty_backgrounds = False
+
 # Setup the display
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Sun Voyage")
-clock = pygame.time.Clock()
+def get_screen():
+    global _screen
+    if _screen is None:
+        pygame.display.init()
+        _screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Sun Voyage")
+    return _screen
 
 # Font setup
-font_large = pygame.font.Font(None, 72)
-font_medium = pygame.font.Font(None, 48)
-font_small = pygame.font.Font(None, 28)
+def get_font(size):
+    if not _fonts:
+        pygame.font.init()
+        _fonts["large"] = pygame.font.Font(None, 72)
+        _fonts["medium"] = pygame.font.Font(None, 48)
+        _fonts["small"] = pygame.font.Font(None, 28)
+    return _fonts[size]
+
+# Sound effects, rendered from the synth's wavetables in the mixer's format
+def tone_voice(frequency, duration=0.3, volume=0.5, is_enemy=False):
+    # Enemy sounds get some noise
+    return synth.Voice(frequency, duration, volume, noise=0.1 if is_enemy else 0.0)
 
-# Sound effects
 def create_tone(frequency, duration=0.3, volume=0.5, is_enemy=False):
-    sample_rate = 44100
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    wave = np.sin(frequency * t * 2 * np.pi)
-    
-    if is_enemy:
-        # Add some noise for enemy sounds
-        noise = np.random.normal(0, 0.1, wave.shape)
-        wave = wave + noise
-        wave = np.clip(wave, -1, 1)
-    
-    wave = (wave * 32767 * volume).astype(np.int16)
-    sound = pygame.sndarray.make_sound(wave)
-    return sound
+    return synth.make_sound(synth.mix([tone_voice(frequency, duration, volume, is_enemy)]))
+
+def create_tones(frequencies, is_enemy=False):
+    # A named set of tones, all rendered in one pass
+    names = list(frequencies)
+    voices = [tone_voice(frequencies[name], is_enemy=is_enemy) for name in names]
+    rows = synth.render_voices(voices)
+    return {name: synth.make_sound(row) for name, row in zip(names, rows)}
 
 # Create various tones
-player_tones = {
-    "blast": create_tone(440),  # A4
-    "forcefield": create_tone(523.25),  # C5
-    "fission": create_tone(659.25),  # E5
-    "fusion": create_tone(783.99)  # G5
-}
+def create_player_tones():
+    return create_tones({
+        "blast": 440,  # A4
+        "forcefield": 523.25,  # C5
+        "fission": 659.25,  # E5
+        "fusion": 783.99  # G5
+    })
+
+def create_enemy_tones():
+    return create_tones({
+        "attack": 415.30,  # G#4
+        "defend": 493.88,  # B4
+        "special": 622.25,  # D#5
+        "heal": 739.99  # F#5
+    }, is_enemy=True)
+
+# Title music notes
+TITLE_NOTES = [
+    (392.00, 0.5),  # G4
+    (440.00, 0.5),  # A4
+    (493.88, 0.5),  # B4
+    (523.25, 1.0),  # C5
+    (493.88, 0.5),  # B4
+    (440.00, 0.5),  # A4
+    (392.00, 1.0),  # G4
+    (440.00, 0.5),  # A4
+    (493.88, 0.5),  # B4
+    (523.25, 1.0),  # C5
+    (587.33, 1.0),  # D5
+    (659.25, 2.0),  # E5
+]
 
-enemy_tones = {
-    "attack": create_tone(415.30, is_enemy=True),  # G#4
-    "defend": create_tone(493.88, is_enemy=True),  # B4
-    "special": create_tone(622.25, is_enemy=True),  # D#5
-    "heal": create_tone(739.99, is_enemy=True)  # F#5
+# Ending music notes (more melodic and peaceful)
+ENDING_NOTES = [
+    (523.25, 0.5),  # C5
+    (587.33, 0.5),  # D5
+    (659.25, 1.0),  # E5
+    (698.46, 1.0),  # F5
+    (783.99, 1.0),  # G5
+    (880.00, 1.0),  # A5
+    (987.77, 1.5),  # B5
+    (1046.50, 2.0), # C6
+]
+
+# Music tracks as NoteStream arguments; the ending adds harmonics for a
+# richer tone
+MUSIC_TRACKS = {
+    "title": (TITLE_NOTES, 0.0),
+    "ending": (ENDING_NOTES, 0.3),
 }
 
-# Create the title music
-def create_title_music():
-    notes = [
-        (392.00, 0.5),  # G4
-        (440.00, 0.5),  # A4
-        (493.88, 0.5),  # B4
-        (523.25, 1.0),  # C5
-        (493.88, 0.5),  # B4
-        (440.00, 0.5),  # A4
-        (392.00, 1.0),  # G4
-        (440.00, 0.5),  # A4
-        (493.88, 0.5),  # B4
-        (523.25, 1.0),  # C5
-        (587.33, 1.0),  # D5
-        (659.25, 2.0),  # E5
-    ]
-    
-    sample_rate = 44100
-    audio_data = np.array([], dtype=np.int16)
-    
-    for frequency, duration in notes:
-        t = np.linspace(0, duration, int(sample_rate * duration), False)
-        note = np.sin(frequency * t * 2 * np.pi)
-        note = (note * 32767 * 0.5).astype(np.int16)
-        audio_data = np.append(audio_data, note)
-    
-    sound = pygame.sndarray.make_sound(audio_data)
-    return sound
+def get_sounds():
+    if not _sounds:
+        if not mixer.get_init():
+            mixer.init()
+        _sounds["player_tones"] = create_player_tones()
+        _sounds["enemy_tones"] = create_enemy_tones()
+    return _sounds
 
-# Create ending music (more melodic and peaceful)
-def create_ending_music():
-    notes = [
-        (523.25, 0.5),  # C5
-        (587.33, 0.5),  # D5
-        (659.25, 1.0),  # E5
-        (698.46, 1.0),  # F5
-        (783.99, 1.0),  # G5
-        (880.00, 1.0),  # A5
-        (987.77, 1.5),  # B5
-        (1046.50, 2.0), # C6
-    ]
-    
-    sample_rate = 44100
-    audio_data = np.array([], dtype=np.int16)
-    
-    for frequency, duration in notes:
-        t = np.linspace(0, duration, int(sample_rate * duration), False)
-        note = np.sin(frequency * t * 2 * np.pi)
-        
-        # Add harmonics for a richer tone
-        harmonic = np.sin(2 * frequency * t * 2 * np.pi) * 0.3
-        note = note + harmonic
-        
-        note = (note * 32767 * 0.5).astype(np.int16)
-        audio_data = np.append(audio_data, note)
-    
-    sound = pygame.sndarray.make_sound(audio_data)
-    return sound
+# Music is streamed on a reserved channel so sound effects never steal it
+def get_music():
+    global _music
+    if _music is None:
+        get_sounds()
+        mixer.set_reserved(1)
+        _music = MusicPlayer(mixer.Channel(0))
+    return _music
+
+def play_music(track):
+    notes, harmonic = MUSIC_TRACKS[track]
+    get_music().play(NoteStream(notes, harmonic, sample_rate=synth.mixer_format()[0]))
+
+# Old module attributes, resolved lazily for code that imports them
+def __getattr__(name):
+    if name in ("font_large", "font_medium", "font_small"):
+        return get_font(name[len("font_"):])
+    if name in ("player_tones", "enemy_tones"):
+        return get_sounds()[name]
+    if name == "screen":
+        return get_screen()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def init_game():
+    # Everything main() needs before the first frame; the mixer opens in
+    # whatever format the device prefers and sounds are made to match
+    pygame.init()
+    screen = get_screen()
+    get_layers(screen.get_size())
+    get_font("small")
+    get_sounds()
+    get_music()
+    return screen
 
-title_music = create_title_music()
-ending_music = create_ending_music()
+# Star backgrounds per scene: the parallax layers' (speed, motion) and the
+# Starfield's (count, speed range, motion)
+BACKGROUNDS = {
+    "title": {"parallax": (1.0, "left"), "starfield": (100, (0.2, 1.0), "left")},
+    "name_input": {"parallax": (0.5, "down"), "starfield": (50, (0.1, 0.5), "down")},
+    "intro": {"parallax": (0.5, "down"), "starfield": (50, (0.1, 0.5), "down")},
+    "battle": {"parallax": (2.0, "down"), "starfield": (50, (0.5, 2.0), "down")},
+    "ending": {"parallax": (0.3, "swirl"), "starfield": (50, (0.1, 0.3), "swirl")},
+}
+
+def make_background(scene):
+    # The parallax layers are cheapest to draw, but some layer moves on
+    # almost every frame and takes the whole screen with it. With dirty
+    # rects the sparse Starfield is drawn instead, which only dirties the
+    # cells its stars pass through.
+    if _dirty_backgrounds:
+        return Starfield(*BACKGROUNDS[scene]["starfield"], area=(WIDTH, HEIGHT))
+    return ParallaxBackground(*BACKGROUNDS[scene]["parallax"], area=(WIDTH, HEIGHT))
 
 # Game states
 TITLE_SCREEN = 0
@@ -135,51 +207,9 @@ BATTLE_SCREEN = 3
 ENDING_SCREEN = 4
 
 # Player class
-class Player:
-    def __init__(self, name="Sun"):
-        self.name = name
-        self.max_health = 100
-        self.health = 100
-        self.power = 20
-        self.defense = 10
-        self.level = 1
-        self.experience = 0
-        self.exp_to_next_level = 100
-        self.victories = 0
-    
-    def attack(self):
-        return random.randint(int(self.power * 0.8), int(self.power * 1.2))
-    
-    def defend(self):
-        return self.defense * 2
+class Player(battle_engine.Player):
+    __slots__ = ()
     
-    def fission(self):
-        # Powerful attack that costs health
-        cost = int(self.max_health * 0.1)
-        self.health = max(1, self.health - cost)
-        return random.randint(int(self.power * 1.5), int(self.power * 2.0))
-    
-    def fusion(self):
-        # Heal self
-        heal_amount = int(self.max_health * 0.3)
-        self.health = min(self.max_health, self.health + heal_amount)
-        return heal_amount
-    
-    def gain_experience(self, amount):
-        self.experience += amount
-        if self.experience >= self.exp_to_next_level:
-            self.level_up()
-    
-    def level_up(self):
-        self.level += 1
-        self.experience -= self.exp_to_next_level
-        self.exp_to_next_level = int(self.exp_to_next_level * 1.5)
-        self.max_health += 20
-        self.health = self.max_health
-        self.power += 5
-        self.defense += 3
-        return True
-        
     def draw(self, screen):
         # Draw the sun (player)
         sun_radius = 50
@@ -200,223 +230,19 @@ class Player:
         pygame.draw.rect(screen, GREEN, (WIDTH // 2 - 100, HEIGHT - 20, int(200 * health_percentage), 15))
         
         # Draw player name and health
-        name_text = font_small.render(f"{self.name} - Level {self.level}", True, WHITE)
-        health_text = font_small.render(f"HP: {self.health}/{self.max_health}", True, WHITE)
+        name_text = text_cache.render(get_font("small"), f"{self.name} - Level {self.level}", WHITE)
+        health_text = text_cache.render(get_font("small"), f"HP: {self.health}/{self.max_health}", WHITE)
         screen.blit(name_text, (WIDTH // 2 - 100, HEIGHT - 40))
         screen.blit(health_text, (WIDTH // 2 + 30, HEIGHT - 40))
 
 # Enemy class
-class Enemy:
-    def __init__(self, level):
-        self.types = [
-            {"name": "Planet", "color": BLUE, "radius": 40},
-            {"name": "Comet", "color": WHITE, "radius": 30},
-            {"name": "Black Hole", "color": PURPLE, "radius": 35},
-            {"name": "Meteor", "color": ORANGE, "radius": 25},
-            {"name": "Nebula", "color": (138, 43, 226), "radius": 45},
-            {"name": "Neutron Star", "color": (0, 191, 255), "radius": 30},
-            {"name": "Supernova", "color": (255, 69, 0), "radius": 50},
-            {"name": "Asteroid", "color": (169, 169, 169), "radius": 35}
-        ]
-        
-        self.type = random.choice(self.types)
-        self.name = self.type["name"]
-        self.color = self.type["color"]
-        self.radius = self.type["radius"]
-        
-        # Scale difficulty with player level
-        level_factor = 0.8 + (level * 0.2)
-        self.max_health = int(80 * level_factor)
-        self.health = self.max_health
-        self.power = int(15 * level_factor)
-        self.defense = int(8 * level_factor)
-        self.exp_reward = int(50 * level_factor)
-        
-        # Special attributes based on enemy type
-        if self.name == "Black Hole":
-            self.power *= 1.5
-            self.defense *= 0.7
-        elif self.name == "Neutron Star":
-            self.power *= 1.2
-            self.max_health *= 1.2
-            self.health = self.max_health
-        elif self.name == "Supernova":
-            self.power *= 2
-            self.max_health *= 0.8
-            self.health = self.max_health
-            self.defense *= 0.5
-    
-    def choose_action(self):
-        # AI for enemy actions
-        if self.health < self.max_health * 0.3:
-            # Low health, 50% chance to heal
-            if random.random() < 0.5:
-                return "heal"
-        
-        if self.health < self.max_health * 0.5:
-            # Medium health, 30% chance to defend, 10% chance to heal
-            rand = random.random()
-            if rand < 0.3:
-                return "defend"
-            elif rand < 0.4:
-                return "heal"
-        
-        # Otherwise mostly attack, sometimes use special
-        if random.random() < 0.7:
-            return "attack"
-        else:
-            return "special"
-    
-    def attack(self):
-        return random.randint(int(self.power * 0.8), int(self.power * 1.2))
-    
-    def defend(self):
-        return self.defense * 2
+class Enemy(battle_engine.Enemy):
+    __slots__ = ()
     
-    def special(self):
-        # Special attack based on enemy type
-        if self.name == "Black Hole":
-            return random.randint(int(self.power * 1.5), int(self.power * 2.0))
-        elif self.name == "Supernova":
-            return random.randint(int(self.power * 1.8), int(self.power * 2.2))
-        else:
-            return random.randint(int(self.power * 1.3), int(self.power * 1.7))
-    
-    def heal(self):
-        heal_amount = int(self.max_health * 0.2)
-        self.health = min(self.max_health, self.health + heal_amount)
-        return heal_amount
-    
-    def draw(self, screen, flash=False):
-        # Draw the enemy based on its type
-        if flash:
-            color = WHITE  # Flash white when hit
-        else:
-            color = self.color
-        
-        if self.name == "Planet":
-            pygame.draw.circle(screen, color, (WIDTH // 2, 100), self.radius)
-            # Draw some details on the planet
-            pygame.draw.arc(screen, (200, 200, 200), (WIDTH // 2 - self.radius, 100 - self.radius, 
-                                                     self.radius * 2, self.radius * 2), 
-                           0, np.pi / 2, 2)
-        
-        elif self.name == "Comet":
-            # Draw comet head
-            pygame.draw.circle(screen, color, (WIDTH // 2, 100), self.radius)
-            # Draw comet tail
-            points = [
-                (WIDTH // 2, 100 - self.radius),
-                (WIDTH // 2 - self.radius * 2, 100 - self.radius * 2),
-                (WIDTH // 2, 100 + self.radius)
-            ]
-            pygame.draw.polygon(screen, color, points)
-        
-        elif self.name == "Black Hole":
-            # Outer ring
-            pygame.draw.circle(screen, (100, 0, 100), (WIDTH // 2, 100), self.radius + 10)
-            # Inner black hole
-            pygame.draw.circle(screen, BLACK, (WIDTH // 2, 100), self.radius)
-            # Draw some "gravitational lensing" effect
-            for i in range(8):
-                angle = i * np.pi / 4
-                x1 = WIDTH // 2 + int((self.radius + 10) * np.cos(angle))
-                y1 = 100 + int((self.radius + 10) * np.sin(angle))
-                x2 = WIDTH // 2 + int((self.radius + 30) * np.cos(angle))
-                y2 = 100 + int((self.radius + 30) * np.sin(angle))
-                pygame.draw.line(screen, PURPLE, (x1, y1), (x2, y2), 2)
-        
-        elif self.name == "Meteor":
-            # Draw irregular meteor shape
-            points = []
-            for i in range(8):
-                angle = i * np.pi / 4
-                r = self.radius * (0.8 + random.random() * 0.4)
-                x = WIDTH // 2 + int(r * np.cos(angle))
-                y = 100 + int(r * np.sin(angle))
-                points.append((x, y))
-            pygame.draw.polygon(screen, color, points)
-            
-            # Draw some meteor details
-            for _ in range(5):
-                x = WIDTH // 2 + random.randint(-self.radius//2, self.radius//2)
-                y = 100 + random.randint(-self.radius//2, self.radius//2)
-                pygame.draw.circle(screen, (100, 100, 100), (x, y), 3)
-        
-        elif self.name == "Nebula":
-            # Create a cloud-like shape for the nebula
-            center_x, center_y = WIDTH // 2, 100
-            
-            # Draw several overlapping circles for cloud effect
-            for offset_x, offset_y, size in [
-                (-10, -10, 0.7),
-                (10, -15, 0.8),
-                (15, 5, 0.75),
-                (-5, 10, 0.9),
-                (0, 0, 1)
-            ]:
-                pygame.draw.circle(
-                    screen, 
-                    color, 
-                    (center_x + offset_x, center_y + offset_y), 
-                    int(self.radius * size)
-                )
-                
-            # Add some stars inside the nebula
-            for _ in range(10):
-                x = center_x + random.randint(-self.radius, self.radius)
-                y = center_y + random.randint(-self.radius, self.radius)
-                # Only draw if point is roughly inside the nebula
-                if (x - center_x)**2 + (y - center_y)**2 < self.radius**2:
-                    pygame.draw.circle(screen, WHITE, (x, y), 2)
-        
-        elif self.name == "Neutron Star":
-            # Draw the star
-            pygame.draw.circle(screen, color, (WIDTH // 2, 100), self.radius)
-            
-            # Draw pulsing rings
-            for i in range(3):
-                ring_radius = self.radius + 10 + (i * 10)
-                pygame.draw.circle(screen, color, (WIDTH // 2, 100), ring_radius, 2)
-            
-            # Draw core
-            pygame.draw.circle(screen, WHITE, (WIDTH // 2, 100), self.radius // 2)
-        
-        elif self.name == "Supernova":
-            # Draw the expanding explosion
-            for i in range(3):
-                explosion_radius = self.radius - (i * 10)
-                color_val = min(255, 150 + i * 50)
-                explosion_color = (color_val, 100 - i * 30, 0)
-                pygame.draw.circle(screen, explosion_color, (WIDTH // 2, 100), explosion_radius)
-            
-            # Draw some explosion rays
-            for i in range(12):
-                angle = i * np.pi / 6
-                x1 = WIDTH // 2 + int(self.radius * np.cos(angle))
-                y1 = 100 + int(self.radius * np.sin(angle))
-                x2 = WIDTH // 2 + int((self.radius + 30) * np.cos(angle))
-                y2 = 100 + int((self.radius + 30) * np.sin(angle))
-                pygame.draw.line(screen, (255, 200, 0), (x1, y1), (x2, y2), 3)
-        
-        elif self.name == "Asteroid":
-            # Draw irregular asteroid shape
-            points = []
-            for i in range(10):
-                angle = i * np.pi / 5
-                r = self.radius * (0.8 + random.random() * 0.4)
-                x = WIDTH // 2 + int(r * np.cos(angle))
-                y = 100 + int(r * np.sin(angle))
-                points.append((x, y))
-            pygame.draw.polygon(screen, color, points)
-            
-            # Draw some crater details
-            for _ in range(4):
-                x = WIDTH // 2 + random.randint(-self.radius//2, self.radius//2)
-                y = 100 + random.randint(-self.radius//2, self.radius//2)
-                crater_size = random.randint(4, 8)
-                pygame.draw.circle(screen, (50, 50, 50), (x, y), crater_size)
-                pygame.draw.circle(screen, (30, 30, 30), (x, y), crater_size - 2)
+    def draw(self, screen, flash=False, frame=0):
+        # Draw the enemy from its pre-rendered sprite
+        sprite = enemy_sprites.get_enemy_sprite(self.name, self.color, self.radius, flash, frame)
+        screen.blit(sprite, sprite.get_rect(center=(WIDTH // 2, 100)))
         
         # Draw health bar
         health_percentage = self.health / self.max_health
@@ -424,18 +250,35 @@ class Enemy:
         pygame.draw.rect(screen, GREEN, (WIDTH // 2 - 100, 30, int(200 * health_percentage), 15))
         
         # Draw enemy name and health
-        name_text = font_small.render(self.name, True, WHITE)
-        health_text = font_small.render(f"HP: {self.health}/{self.max_health}", True, WHITE)
+        name_text = text_cache.render(get_font("small"), self.name, WHITE)
+        health_text = text_cache.render(get_font("small"), f"HP: {self.health}/{self.max_health}", WHITE)
         screen.blit(name_text, (WIDTH // 2 - 100, 10))
         screen.blit(health_text, (WIDTH // 2 + 30, 10))
 
+# Particle effects for battle actions: (effect, where it starts)
+ACTION_EFFECTS = {
+    "blast": ("blast", "enemy"),
+    "fission": ("fission", "enemy"),
+    "fusion": ("fusion", "player"),
+    "attack": ("hit", "player"),
+    "special": ("hit", "player"),
+    "heal": ("heal", "enemy"),
+}
+
+# Enemy specials with an effect of their own
+SPECIAL_EFFECTS = {
+    "Supernova": ("supernova", "enemy"),
+    "Black Hole": ("black_hole", "enemy"),
+}
+
+EFFECT_POSITIONS = {"player": (WIDTH // 2, HEIGHT - 100), "enemy": (WIDTH // 2, 100)}
+
 # Battle system class
-class BattleSystem:
-    def __init__(self, player):
-        self.player = player
-        self.enemy = None
-        self.state = "player_turn"  # "player_turn", "enemy_turn", "win", "lose"
-        self.message = ""
+class BattleSystem(battle_engine.Battle):
+    enemy_class = Enemy
+
+    def __init__(self, player, time_scale=1.0, time_source=None):
+        super().__init__(player)
         self.flash_timer = 0
         self.flash_target = None  # "player" or "enemy"
         self.animation_frame = 0
@@ -444,26 +287,29 @@ class BattleSystem:
         self.log_rect = pygame.Rect(WIDTH // 2 - 200, HEIGHT // 2 - 50, 400, 100)
         
         # Menu items
-        self.menu_items = ["Blast", "Forcefield", "Fission", "Fusion"]
         self.selected_item = 0
         
+        # Pending turn changes; state is "waiting" while one is queued and
+        # pending_state is the state it will switch to
+        self.pending_state = None
+        if time_source is None:
+            self.scheduler = TurnScheduler(time_scale=time_scale)
+        else:
+            self.scheduler = TurnScheduler(time_source, time_scale)
+        
         # Animation elements for the space background
-        self.stars = []
         self.reset_stars()
+        self.regions = RegionTracker()
+        
+        # Hit, heal and explosion effects
+        self.particles = ParticleSystem()
     
     def reset_stars(self):
-        self.stars = []
-        for _ in range(50):
-            x = random.randint(0, WIDTH)
-            y = random.randint(0, HEIGHT)
-            speed = random.uniform(0.5, 2.0)
-            size = random.randint(1, 3)
-            self.stars.append({"x": x, "y": y, "speed": speed, "size": size})
+        self.stars = make_background("battle")
     
     def new_battle(self):
-        self.enemy = Enemy(self.player.level)
-        self.state = "player_turn"
-        self.message = f"A {self.enemy.name} appears in space!"
+        self.scheduler.clear()
+        super().new_battle()
         self.selected_item = 0
         self.animation_frame = 0
     
@@ -472,117 +318,94 @@ class BattleSystem:
         self.animation_frame += 1
         
         # Update star positions
-        for star in self.stars:
-            star["y"] += star["speed"]
-            if star["y"] > HEIGHT:
-                star["y"] = 0
-                star["x"] = random.randint(0, WIDTH)
+        self.stars.update()
         
         # Update flash effect
         if self.flash_timer > 0:
             self.flash_timer -= 1
+        
+        self.particles.update()
+        
+        # Run turn changes that are due
+        self.scheduler.update()
+    
+    def frame_rate(self):
+        # Flashes, particles and turn changes want every frame; otherwise
+        # only the stars move
+        if self.flash_timer > 0 or len(self.particles) or self.state in ("waiting", "enemy_turn"):
+            return None
+        return BATTLE_IDLE_FPS
+    
+    def resume(self, state):
+        self.state = state
+        self.pending_state = None
+    
+    def snapshot(self, into=None, rng=True):
+        # A queued turn change is captured as if it had already happened
+        snapshot = super().snapshot(into, rng)
+        if self.state == "waiting":
+            snapshot.state = self.pending_state
+        return snapshot
+    
+    def restore(self, snapshot):
+        self.scheduler.clear()
+        self.pending_state = None
+        self.flash_timer = 0
+        self.particles.clear()
+        super().restore(snapshot)
     
     def player_action(self, action):
         if self.state != "player_turn":
             return
         
-        if action == "Blast":
-            damage = self.player.attack()
-            self.enemy.health = max(0, self.enemy.health - damage)
-            self.message = f"{self.player.name} blasts the {self.enemy.name} for {damage} damage!"
-            player_tones["blast"].play()
-            
-        elif action == "Forcefield":
-            defense_bonus = self.player.defend()
-            self.message = f"{self.player.name} creates a forcefield, increasing defense by {defense_bonus}!"
-            player_tones["forcefield"].play()
-            
-        elif action == "Fission":
-            damage = self.player.fission()
-            self.enemy.health = max(0, self.enemy.health - damage)
-            self.message = f"{self.player.name} releases fission energy for {damage} damage!"
-            player_tones["fission"].play()
-            
-        elif action == "Fusion":
-            heal_amount = self.player.fusion()
-            self.message = f"{self.player.name} uses fusion to restore {heal_amount} health!"
-            player_tones["fusion"].play()
+        result = super().player_action(action)
+        self.spawn_effect()
+        get_sounds()["player_tones"][self.last_action].play()
         
         # Flash effect for enemy
         self.flash_timer = 15
         self.flash_target = "enemy"
         
-        # Check win condition
-        if self.enemy.health <= 0:
-            self.state = "win"
-            self.message = f"You defeated the {self.enemy.name}!"
-            exp_gained = self.enemy.exp_reward
-            self.player.gain_experience(exp_gained)
-            self.player.victories += 1
-            
-            if self.player.victories >= 10:  # Win game after 10 victories
-                return "game_won"
-            
-            return
-        
         # Switch to enemy turn after a delay
-        pygame.time.delay(500)
-        self.state = "enemy_turn"
+        if self.state == "enemy_turn":
+            self.state = "waiting"
+            self.pending_state = "enemy_turn"
+            self.scheduler.schedule(TURN_DELAY, self.resume, "enemy_turn")
+        
+        return result
     
     def enemy_action(self):
         if self.state != "enemy_turn":
             return
         
-        action = self.enemy.choose_action()
-        
-        if action == "attack":
-            damage = self.enemy.attack()
-            self.player.health = max(0, self.player.health - damage)
-            self.message = f"The {self.enemy.name} attacks for {damage} damage!"
-            enemy_tones["attack"].play()
-            
-        elif action == "defend":
-            defense_bonus = self.enemy.defend()
-            self.message = f"The {self.enemy.name} strengthens its defenses!"
-            enemy_tones["defend"].play()
-            
-        elif action == "special":
-            damage = self.enemy.special()
-            self.player.health = max(0, self.player.health - damage)
-            
-            # Special message based on enemy type
-            if self.enemy.name == "Black Hole":
-                self.message = f"The Black Hole generates gravitational forces for {damage} damage!"
-            elif self.enemy.name == "Supernova":
-                self.message = f"The Supernova explodes with energy for {damage} damage!"
-            else:
-                self.message = f"The {self.enemy.name} unleashes a cosmic attack for {damage} damage!"
-                
-            enemy_tones["special"].play()
-            
-        elif action == "heal":
-            heal_amount = self.enemy.heal()
-            self.message = f"The {self.enemy.name} absorbs cosmic energy and recovers {heal_amount} health!"
-            enemy_tones["heal"].play()
+        super().enemy_action()
+        self.spawn_effect()
+        get_sounds()["enemy_tones"][self.last_action].play()
         
         # Flash effect for player
         self.flash_timer = 15
         self.flash_target = "player"
         
-        # Check lose condition
-        if self.player.health <= 0:
-            self.state = "lose"
-            self.message = "You have been defeated!"
-            return
-        
         # Switch back to player turn after a delay
-        pygame.time.delay(500)
-        self.state = "player_turn"
+        if self.state == "player_turn":
+            self.state = "waiting"
+            self.pending_state = "player_turn"
+            self.scheduler.schedule(TURN_DELAY, self.resume, "player_turn")
     
-    def draw(self, screen):
+    def spawn_effect(self):
+        # Particles for the action that was just taken
+        effect = ACTION_EFFECTS.get(self.last_action)
+        if self.last_action == "special":
+            effect = SPECIAL_EFFECTS.get(self.enemy.name, effect)
+        if effect is None:
+            return
+        name, where = effect
+        colors = [self.enemy.color] if name == "hit" else None
+        self.particles.spawn(name, EFFECT_POSITIONS[where], colors)
+    
+    def draw(self, screen, alpha=1.0):
         # Draw stars in the background
-        for star in self.stars:
-            pygame.draw.circle(screen, WHITE, (int(star["x"]), int(star["y"])), star["size"])
+        self.stars.draw(screen, alpha=alpha)
         
         # Draw player and enemy
         should_flash_player = self.flash_timer > 0 and self.flash_target == "player"
@@ -590,28 +413,20 @@ class BattleSystem:
         
         self.player.draw(screen)
         if self.enemy:
-            self.enemy.draw(screen, should_flash_enemy)
+            self.enemy.draw(screen, should_flash_enemy, self.animation_frame)
+        
+        # Effects go over the combatants but under the text
+        self.particles.draw(screen, alpha)
         
         # Draw battle log
         pygame.draw.rect(screen, (0, 0, 50), self.log_rect, border_radius=5)
         pygame.draw.rect(screen, (100, 100, 255), self.log_rect, 2, border_radius=5)
         
         # Wrap text to fit in the battle log
-        wrapped_text = []
-        words = self.message.split()
-        line = ""
-        for word in words:
-            test_line = line + word + " "
-            text_width, _ = font_small.size(test_line)
-            if text_width < self.log_rect.width - 20:
-                line = test_line
-            else:
-                wrapped_text.append(line)
-                line = word + " "
-        wrapped_text.append(line)
+        wrapped_text = layout_cache.wrap(get_font("small"), self.message, self.log_rect.width - 20)
         
         for i, line in enumerate(wrapped_text):
-            text_surface = font_small.render(line, True, WHITE)
+            text_surface = text_cache.render(get_font("small"), line, WHITE)
             screen.blit(text_surface, (self.log_rect.x + 10, self.log_rect.y + 10 + i * 25))
         
         # Draw menu if it's player's turn
@@ -626,57 +441,71 @@ class BattleSystem:
                 else:
                     pygame.draw.rect(screen, (50, 50, 50), item_rect, border_radius=3)
                 
-                text = font_small.render(item, True, WHITE)
+                text = text_cache.render(get_font("small"), item, WHITE)
                 screen.blit(text, (item_rect.x + 10, item_rect.y + 5))
         
         # Draw status messages for win/lose
         if self.state == "win":
             # Show level up message if applicable
             if self.player.experience >= self.player.exp_to_next_level:
-                level_up_text = font_medium.render(f"Level Up! {self.player.name} is now level {self.player.level}!", True, YELLOW)
+                level_up_text = text_cache.render(get_font("medium"), f"Level Up! {self.player.name} is now level {self.player.level}!", YELLOW)
                 screen.blit(level_up_text, (WIDTH // 2 - level_up_text.get_width() // 2, HEIGHT // 2 + 80))
                 
-                stats_text = font_small.render("Power and Defense increased!", True, WHITE)
+                stats_text = text_cache.render(get_font("small"), "Power and Defense increased!", WHITE)
                 screen.blit(stats_text, (WIDTH // 2 - stats_text.get_width() // 2, HEIGHT // 2 + 120))
             
             # Press space to continue
-            continue_text = font_small.render("Press Space to continue", True, WHITE)
+            continue_text = text_cache.render(get_font("small"), "Press Space to continue", WHITE)
             screen.blit(continue_text, (WIDTH // 2 - continue_text.get_width() // 2, HEIGHT // 2 + 150))
             
         elif self.state == "lose":
-            game_over_text = font_medium.render("Game Over", True, RED)
+            game_over_text = text_cache.render(get_font("medium"), "Game Over", RED)
             screen.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 + 80))
             
-            restart_text = font_small.render("Press Space to restart", True, WHITE)
+            restart_text = text_cache.render(get_font("small"), "Press Space to restart", WHITE)
             screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 120))
 
+    def dirty_rects(self):
+        # Regions that changed since the last frame, for dirty-rect rendering
+        rects = self.stars.dirty_rects()
+        if self.enemy:
+            extent = enemy_sprites.sprite_extent(self.enemy.radius)
+            frame = self.animation_frame if self.enemy.name in enemy_sprites.JITTER_TYPES else 0
+            flash = self.flash_timer > 0 and self.flash_target == "enemy"
+            self.regions.check("enemy", (WIDTH // 2 - extent, 100 - extent, extent * 2, extent * 2),
+                               (self.enemy, flash, frame % enemy_sprites.ANIMATION_FRAMES), rects)
+            self.regions.check("enemy_status", (WIDTH // 2 - 100, 0, 320, 50),
+                               (self.enemy, self.enemy.health), rects)
+        self.regions.check("player", (WIDTH // 2 - 100, HEIGHT - 170, 320, 170),
+                           (self.player.name, self.player.level, self.player.health, self.player.max_health), rects)
+        self.regions.check("log", self.log_rect, self.message, rects)
+        self.regions.check("menu", (WIDTH // 2 - 100, HEIGHT - 80, 200, 120), (self.state, self.selected_item), rects)
+        self.regions.check("result", (0, HEIGHT // 2 + 70, WIDTH, 110), (self.state, self.player.level), rects)
+        rects.extend(self.particles.dirty_rects())
+        return rects
+
 # Title screen animation
 class TitleScreen:
     def __init__(self):
         self.angle = 0
-        self.stars = []
-        for _ in range(100):
-            x = random.randint(0, WIDTH)
-            y = random.randint(0, HEIGHT)
-            speed = random.uniform(0.2, 1.0)
-            size = random.randint(1, 3)
-            self.stars.append({"x": x, "y": y, "speed": speed, "size": size})
+        self.prev_angle = 0
+        self.stars = make_background("title")
+        self.regions = RegionTracker()
     
     def update(self):
+        self.prev_angle = self.angle
         self.angle += 0.01
         
         # Update star positions
-        for star in self.stars:
-            star["x"] -= star["speed"]
-            if star["x"] < 0:
-                star["x"] = WIDTH
-star["x"] = WIDTH
-                star["y"] = random.randint(0, HEIGHT)
+        self.stars.update()
     
-    def draw(self, screen):
+    def frame_rate(self):
+        # The rays rotate smoothly
+        return None
+    
+    def draw(self, screen, alpha=1.0):
         # Draw stars
-        for star in self.stars:
-            pygame.draw.circle(screen, WHITE, (int(star["x"]), int(star["y"])), star["size"])
+        self.stars.draw(screen, alpha=alpha)
         
         # Draw animated sun
         sun_x = 320
@@ -686,9 +515,10 @@ star["x"] = WIDTH
         # Draw the sun
         pygame.draw.circle(screen, YELLOW, (sun_x, sun_y), sun_radius)
         
-        # Draw rotating rays
+        # Draw rotating rays, alpha of the way between the last two updates
+        rotation = self.prev_angle + (self.angle - self.prev_angle) * alpha
         for i in range(8):
-            angle = self.angle + (i * np.pi / 4)
+            angle = rotation + (i * np.pi / 4)
             x1 = sun_x + int(sun_radius * np.cos(angle))
             y1 = sun_y + int(sun_radius * np.sin(angle))
             x2 = sun_x + int((sun_radius + 20) * np.cos(angle))
@@ -696,27 +526,30 @@ star["x"] = WIDTH
             pygame.draw.line(screen, ORANGE, (x1, y1), (x2, y2), 3)
         
         # Draw title
-        title_text = font_large.render("Sun Voyage", True, YELLOW)
+        title_text = text_cache.render(get_font("large"), "Sun Voyage", YELLOW)
         screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 100))
         
         # Draw press space message
         if int(pygame.time.get_ticks() / 500) % 2 == 0:  # Blinking effect
-            press_text = font_medium.render("Press Space to Play", True, WHITE)
+            press_text = text_cache.render(get_font("medium"), "Press Space to Play", WHITE)
             screen.blit(press_text, (WIDTH // 2 - press_text.get_width() // 2, 400))
 
+    def dirty_rects(self):
+        rects = self.stars.dirty_rects()
+        # The rotating rays
+        rects.append(pygame.Rect(320 - 62, 240 - 62, 124, 124))
+        blink = int(pygame.time.get_ticks() / 500) % 2
+        self.regions.check("press", (0, 400, WIDTH, 40), blink, rects)
+        return rects
+
 # Name input screen
 class NameInputScreen:
     def __init__(self):
         self.name = ""
         self.cursor_visible = True
         self.cursor_timer = 0
-        self.stars = []
-        for _ in range(50):
-            x = random.randint(0, WIDTH)
-            y = random.randint(0, HEIGHT)
-            speed = random.uniform(0.1, 0.5)
-            size = random.randint(1, 3)
-            self.stars.append({"x": x, "y": y, "speed": speed, "size": size})
+        self.stars = make_background("name_input")
+        self.regions = RegionTracker()
     
     def update(self):
         # Cursor blinking
@@ -726,11 +559,10 @@ class NameInputScreen:
             self.cursor_visible = not self.cursor_visible
         
         # Update star positions
-        for star in self.stars:
-            star["y"] += star["speed"]
-            if star["y"] > HEIGHT:
-                star["y"] = 0
-                star["x"] = random.randint(0, WIDTH)
+        self.stars.update()
+    
+    def frame_rate(self):
+        return SLOW_FPS
     
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
@@ -743,13 +575,12 @@ class NameInputScreen:
                     self.name += event.unicode
         return None
     
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         # Draw stars
-        for star in self.stars:
-            pygame.draw.circle(screen, WHITE, (int(star["x"]), int(star["y"])), star["size"])
+        self.stars.draw(screen, alpha=alpha)
         
         # Draw title
-        title_text = font_medium.render("Enter Your Name:", True, WHITE)
+        title_text = text_cache.render(get_font("medium"), "Enter Your Name:", WHITE)
         screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 200))
         
         # Draw name input box
@@ -764,29 +595,28 @@ class NameInputScreen:
         
         if not display_name:
             display_name = "Sun"  # Default name
-            name_text = font_medium.render(display_name, True, (150, 150, 150))  # Grayed out
+            name_text = text_cache.render(get_font("medium"), display_name, (150, 150, 150))  # Grayed out
         else:
-            name_text = font_medium.render(display_name, True, WHITE)
+            name_text = text_cache.render(get_font("medium"), display_name, WHITE)
         
         screen.blit(name_text, (input_rect.x + 10, input_rect.y + 10))
         
         # Draw instructions
-        instr_text = font_small.render("Press Enter to confirm", True, WHITE)
+        instr_text = text_cache.render(get_font("small"), "Press Enter to confirm", WHITE)
         screen.blit(instr_text, (WIDTH // 2 - instr_text.get_width() // 2, 320))
 
+    def dirty_rects(self):
+        rects = self.stars.dirty_rects()
+        self.regions.check("name", (0, 250, WIDTH, 50), (self.name, self.cursor_visible), rects)
+        return rects
+
 # Intro screen
 class IntroScreen:
     def __init__(self, player_name):
         self.player_name = player_name if player_name else "Sun"
         self.timer = 0
         self.done = False
-        self.stars = []
-        for _ in range(50):
-            x = random.randint(0, WIDTH)
-            y = random.randint(0, HEIGHT)
-            speed = random.uniform(0.1, 0.5)
-            size = random.randint(1, 3)
-            self.stars.append({"x": x, "y": y, "speed": speed, "size": size})
+        self.stars = make_background("intro")
     
     def update(self):
         self.timer += 1
@@ -794,38 +624,34 @@ class IntroScreen:
             self.done = True
         
         # Update star positions
-        for star in self.stars:
-            star["y"] += star["speed"]
-            if star["y"] > HEIGHT:
-                star["y"] = 0
-                star["x"] = random.randint(0, WIDTH)
+        self.stars.update()
     
-    def draw(self, screen):
+    def frame_rate(self):
+        return SLOW_FPS
+    
+    def draw(self, screen, alpha=1.0):
         # Draw stars
-        for star in self.stars:
-            pygame.draw.circle(screen, WHITE, (int(star["x"]), int(star["y"])), star["size"])
+        self.stars.draw(screen, alpha=alpha)
         
         # Draw text
-        text1 = font_medium.render(f"You are {self.player_name}", True, WHITE)
-        text2 = font_medium.render("on drift in endless space.", True, WHITE)
-        text3 = font_medium.render("You fight to survive.", True, WHITE)
+        text1 = text_cache.render(get_font("medium"), f"You are {self.player_name}", WHITE)
+        text2 = text_cache.render(get_font("medium"), "on drift in endless space.", WHITE)
+        text3 = text_cache.render(get_font("medium"), "You fight to survive.", WHITE)
         
         screen.blit(text1, (WIDTH // 2 - text1.get_width() // 2, 200))
         screen.blit(text2, (WIDTH // 2 - text2.get_width() // 2, 250))
         screen.blit(text3, (WIDTH // 2 - text3.get_width() // 2, 300))
 
+    def dirty_rects(self):
+        return self.stars.dirty_rects()
+
 # End screen
 class EndingScreen:
     def __init__(self):
         self.timer = 0
         self.flower_stage = 0
-        self.stars = []
-        for _ in range(50):
-            x = random.randint(0, WIDTH)
-            y = random.randint(0, HEIGHT)
-            speed = random.uniform(0.1, 0.3)
-            size = random.randint(1, 3)
-            self.stars.append({"x": x, "y": y, "speed": speed, "size": size})
+        self.stars = make_background("ending")
+        self.regions = RegionTracker()
     
     def update(self):
         self.timer += 1
@@ -833,21 +659,18 @@ class EndingScreen:
             self.flower_stage += 1
         
         # Update star positions
-        for star in self.stars:
-            star["x"] += star["speed"] * np.cos(star["y"] * 0.01)
-            star["y"] += star["speed"] * np.sin(star["x"] * 0.01)
-            if star["y"] < 0 or star["y"] > HEIGHT or star["x"] < 0 or star["x"] > WIDTH:
-                star["x"] = random.randint(0, WIDTH)
-                star["y"] = random.randint(0, HEIGHT)
+        self.stars.update()
     
-    def draw(self, screen):
+    def frame_rate(self):
+        return SLOW_FPS
+    
+    def draw(self, screen, alpha=1.0):
         # Draw stars
-        for star in self.stars:
-            pygame.draw.circle(screen, WHITE, (int(star["x"]), int(star["y"])), star["size"])
+        self.stars.draw(screen, alpha=alpha)
         
         # Draw text
-        text = font_medium.render("You reached a perfect galaxy", True, WHITE)
-        text2 = font_medium.render("where you stay and create life.", True, WHITE)
+        text = text_cache.render(get_font("medium"), "You reached a perfect galaxy", WHITE)
+        text2 = text_cache.render(get_font("medium"), "where you stay and create life.", WHITE)
         
         screen.blit(text, (WIDTH // 2 - text.get_width() // 2, 100))
         screen.blit(text2, (WIDTH // 2 - text2.get_width() // 2, 150))
@@ -893,11 +716,58 @@ class EndingScreen:
         # Draw "Press Space to return to title" text
         if self.timer > 300:  # After 5 seconds
             if int(pygame.time.get_ticks() / 500) % 2 == 0:  # Blinking effect
-                restart_text = font_small.render("Press Space to return to title", True, WHITE)
+                restart_text = text_cache.render(get_font("small"), "Press Space to return to title", WHITE)
                 screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, 500))
 
+    def dirty_rects(self):
+        rects = self.stars.dirty_rects()
+        self.regions.check("flower", (WIDTH // 2 - 50, 300, 100, 160), self.flower_stage, rects)
+        blink = self.timer > 300 and int(pygame.time.get_ticks() / 500) % 2 == 0
+        self.regions.check("restart", (0, 490, WIDTH, 40), blink, rects)
+        return rects
+
 # Main game loop
-def main():
+def main(dirty_rendering=False, stats_path=None, seed=None, record_path=None, replay_path=None,
+         max_speed=False, autoplay=False, save_path=None, capture_path=None, capture_format="raw",
+         capture_policy="drop", latency_path=None, adaptive_pacing=True, render_fps=FPS):
+    # Seed every random stream; a replay brings its own seed
+    replay = InputReplay(replay_path) if replay_path else None
+    streams = random_streams.seed(replay.seed if replay else seed)
+    recorder = InputRecorder(record_path, streams.seed) if record_path else None
+    
+    # Recorded and autoplayed runs time battle turns in frames, so a replay
+    # stays in step and --headless autoplay isn't held up by turn delays
+    frame_index = 0
+    battle_clock = (lambda: frame_index * 1000 / FPS) if (replay or recorder or autoplay) else None
+    
+    screen = init_game()
+    
+    # Scenes update FPS times per second of real time and are drawn between
+    # updates at up to render_fps, lower when little is moving. Recordings,
+    # replays, autoplay and captures are locked to one update per frame.
+    locked = bool(replay or recorder or autoplay or capture_path)
+    pacer = FramePacer(FPS, render_fps, adaptive_pacing, locked, max_speed)
+    
+    # Frame timing per scene; F3 toggles the overlay (and turns recording on)
+    stats = FrameStats(pacer.render_fps, enabled=stats_path is not None)
+    
+    # Key press to flip latency per action, reported on exit
+    latency = LatencyTracker(enabled=latency_path is not None)
+    
+    # With dirty-rect rendering, scenes draw into an off-screen buffer and
+    # only the regions they report are pushed to the display
+    global _dirty_backgrounds
+    _dirty_backgrounds = dirty_rendering
+    renderer = DirtyRenderer(screen) if dirty_rendering else None
+    frame = renderer.buffer if renderer else screen
+    
+    # Presented frames are streamed to disk by a background writer
+    capture = None
+    if capture_path:
+        capture = FrameCapture(capture_path, screen.get_size(), FPS, capture_format, capture_policy)
+    scene = last_scene = None
+    music = get_music()
+    
     # Initialize game state
     game_state = TITLE_SCREEN
     title_screen = TitleScreen()
@@ -911,45 +781,93 @@ def main():
     title_music_playing = False
     ending_music_playing = False
     
+    # Resume a saved campaign, and autosave to the same file from now on
+    autosaver = None
+    saved_enemy = None
+    if save_path:
+        saved = save_game.load_campaign(save_path)
+        if saved:
+            player_name, snapshot = saved
+            player = Player(player_name)
+            battle_system = BattleSystem(player, time_source=battle_clock)
+            battle_system.restore(snapshot)
+            saved_enemy = battle_system.enemy
+            game_state = BATTLE_SCREEN
+        autosaver = save_game.Autosaver(save_path)
+    
+    # The autoplayer skips the menus and plays the optimal policy forever
+    if autoplay and battle_system is None:
+        player = Player()
+        battle_system = BattleSystem(player, time_source=battle_clock)
+        battle_system.new_battle()
+        game_state = BATTLE_SCREEN
+    
     running = True
     while running:
+        stats.begin_frame()
+        latency.begin_frame()
+        
         # Handle events
-        for event in pygame.event.get():
+        events = pacer.get_events()
+        if replay:
+            # Only recorded input drives the game; closing the window still quits
+            events = [event for event in events if event.type == pygame.QUIT] + replay.events(frame_index)
+        
+        for event in events:
+            if recorder:
+                recorder.record(frame_index, event)
+            
             if event.type == pygame.QUIT:
                 running = False
             
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                stats.toggle_overlay()
+                if renderer:
+                    renderer.invalidate()
+                continue
+            
             # Handle key presses based on game state
             if event.type == pygame.KEYDOWN:
                 if game_state == TITLE_SCREEN:
                     if event.key == pygame.K_SPACE:
+                        latency.press("start")
                         game_state = NAME_INPUT
                         if title_music_playing:
-                            title_music.stop()
+                            music.stop()
                             title_music_playing = False
                 
                 elif game_state == NAME_INPUT:
+                    old_name = name_input.name
                     result = name_input.handle_event(event)
                     if result == "done":
+                        latency.press("name_confirm")
                         player_name = name_input.name if name_input.name else "Sun"
                         player = Player(player_name)
                         intro_screen = IntroScreen(player_name)
                         game_state = INTRO_SCREEN
+                    elif name_input.name != old_name:
+                        # Keys that change nothing (Shift, arrows, a full name) aren't tagged
+                        latency.press("name_input")
                 
                 elif game_state == INTRO_SCREEN:
                     # Skip intro with any key
                     if intro_screen.timer > 60:  # Allow skipping after 1 second
-                        battle_system = BattleSystem(player)
+                        latency.press("skip_intro")
+                        battle_system = BattleSystem(player, time_source=battle_clock)
                         battle_system.new_battle()
                         game_state = BATTLE_SCREEN
                 
                 elif game_state == BATTLE_SCREEN:
                     if battle_system.state == "player_turn":
                         if event.key == pygame.K_UP:
+                            latency.press("menu_move")
                             battle_system.selected_item = (battle_system.selected_item - 1) % len(battle_system.menu_items)
                         elif event.key == pygame.K_DOWN:
+                            latency.press("menu_move")
                             battle_system.selected_item = (battle_system.selected_item + 1) % len(battle_system.menu_items)
                         elif event.key == pygame.K_RETURN or event.key == pygame.K_SPACE:
                             selected_action = battle_system.menu_items[battle_system.selected_item]
+                            latency.press(selected_action)
                             result = battle_system.player_action(selected_action)
                             if result == "game_won":
                                 ending_screen = EndingScreen()
@@ -957,72 +875,203 @@ def main():
                         
                     elif battle_system.state == "win":
                         if event.key == pygame.K_SPACE:
+                            latency.press("next_battle")
                             battle_system.new_battle()
                     
                     elif battle_system.state == "lose":
                         if event.key == pygame.K_SPACE:
+                            latency.press("restart")
                             # Reset game
                             player = Player(player.name)
-                            battle_system = BattleSystem(player)
+                            battle_system = BattleSystem(player, time_source=battle_clock)
                             battle_system.new_battle()
                 
                 elif game_state == ENDING_SCREEN:
                     if event.key == pygame.K_SPACE and ending_screen.timer > 300:
+                        latency.press("back_to_title")
                         game_state = TITLE_SCREEN
                         title_screen = TitleScreen()
                         if ending_music_playing:
-                            ending_music.stop()
+                            music.stop()
                             ending_music_playing = False
         
+        stats.lap("events")
+        frame_index += 1
+        
         # Clear the screen
-        screen.fill(BLACK)
+        frame.fill(BLACK)
         
         # Update and draw based on game state
         if game_state == TITLE_SCREEN:
             # Play title music if not already playing
             if not title_music_playing:
-                title_music.play(-1)  # Loop the music
+                play_music("title")  # Streams and loops until stopped
                 title_music_playing = True
             
-            title_screen.update()
-            title_screen.draw(screen)
+            for _ in range(pacer.steps):
+                title_screen.update()
+            stats.lap("update")
+            title_screen.draw(frame, pacer.alpha)
+            stats.lap("draw")
+            scene = title_screen
         
         elif game_state == NAME_INPUT:
-            name_input.update()
-            name_input.draw(screen)
+            for _ in range(pacer.steps):
+                name_input.update()
+            stats.lap("update")
+            name_input.draw(frame, pacer.alpha)
+            stats.lap("draw")
+            scene = name_input
         
         elif game_state == INTRO_SCREEN:
-            intro_screen.update()
-            intro_screen.draw(screen)
+            for _ in range(pacer.steps):
+                intro_screen.update()
+            stats.lap("update")
+            intro_screen.draw(frame, pacer.alpha)
+            stats.lap("draw")
+            scene = intro_screen
             
             if intro_screen.done:
-                battle_system = BattleSystem(player)
+                battle_system = BattleSystem(player, time_source=battle_clock)
                 battle_system.new_battle()
                 game_state = BATTLE_SCREEN
         
         elif game_state == BATTLE_SCREEN:
-            battle_system.update()
-            battle_system.draw(screen)
+            for _ in range(pacer.steps):
+                battle_system.update()
             
+            # Turns are taken before drawing, so the frame (and its dirty
+            # rects) shows their result
             if battle_system.state == "enemy_turn":
                 battle_system.enemy_action()
+            
+            elif autoplay and battle_system.state == "player_turn":
+                action = battle_solver.choose_action(battle_system)
+                battle_system.selected_item = battle_system.menu_items.index(action)
+                if battle_system.player_action(action) == "game_won":
+                    ending_screen = EndingScreen()
+                    game_state = ENDING_SCREEN
+            
+            elif autoplay and battle_system.state == "win":
+                battle_system.new_battle()
+            
+            elif autoplay and battle_system.state == "lose":
+                player = Player(player.name)
+                battle_system = BattleSystem(player, time_source=battle_clock)
+                battle_system.new_battle()
+            stats.lap("update")
+            
+            battle_system.draw(frame, pacer.alpha)
+            stats.lap("draw")
+            scene = battle_system
         
         elif game_state == ENDING_SCREEN:
             # Play ending music if not already playing
             if not ending_music_playing:
-                ending_music.play(-1)  # Loop the music
+                play_music("ending")  # Streams and loops until stopped
                 ending_music_playing = True
                 
-            ending_screen.update()
-            ending_screen.draw(screen)
+            for _ in range(pacer.steps):
+                ending_screen.update()
+            stats.lap("update")
+            ending_screen.draw(frame, pacer.alpha)
+            stats.lap("draw")
+            scene = ending_screen
+            
+            if autoplay and ending_screen.timer > 300:
+                music.stop()
+                ending_music_playing = False
+                player = Player(player.name)
+                battle_system = BattleSystem(player, time_source=battle_clock)
+                battle_system.new_battle()
+                game_state = BATTLE_SCREEN
+        
+        # Autosave once at the end of each won battle; a lost or finished
+        # campaign has nothing left to resume
+        if autosaver:
+            if game_state == BATTLE_SCREEN and battle_system.state == "win":
+                if battle_system.enemy is not saved_enemy:
+                    autosaver.save(battle_system)
+                    saved_enemy = battle_system.enemy
+            elif game_state == ENDING_SCREEN or (game_state == BATTLE_SCREEN and battle_system.state == "lose"):
+                autosaver.clear()
+        
+        stats.draw_overlay(frame, get_font("small"), scene)
         
         # Update the display
-        pygame.display.flip()
-        clock.tick(FPS)
+        if renderer:
+            if scene is not last_scene:
+                renderer.invalidate()
+            rects = scene.dirty_rects()
+            if stats.overlay_rect():
+                rects.append(stats.overlay_rect())
+            renderer.present(rects)
+        else:
+            pygame.display.flip()
+        last_scene = scene
+        latency.presented()
+        stats.lap("flip")
+        if capture:
+            capture.capture(screen, frame_index)
+            stats.lap("capture")
+        stats.end_frame(scene)
+        pacer.wait(scene)
+    
+    if stats_path:
+        stats.export(stats_path)
+    if latency_path:
+        latency.export(latency_path)
+        print(latency.report())
+    if recorder:
+        recorder.close()
+    if capture:
+        capture.close()
+    if autosaver:
+        # Quitting mid-battle keeps the battle as it stands
+        if game_state == BATTLE_SCREEN and battle_system.state != "lose":
+            autosaver.save(battle_system)
+        autosaver.close()
     
     # Clean up pygame
+    music.close()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sun Voyage")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw the parts of the screen that changed")
+    parser.add_argument("--frame-stats", metavar="PATH",
+                        help="record frame timings and write them to PATH (.json or .csv) on exit")
+    parser.add_argument("--seed", type=int, help="seed for all random streams")
+    parser.add_argument("--record", metavar="PATH", help="record key presses to PATH")
+    parser.add_argument("--replay", metavar="PATH", help="play back key presses recorded with --record")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window or sound device, as fast as possible")
+    parser.add_argument("--autoplay", action="store_true",
+                        help="let the optimal-policy autoplayer fight every battle")
+    parser.add_argument("--save", metavar="PATH",
+                        help="resume the campaign saved in PATH and autosave to it")
+    parser.add_argument("--capture", metavar="DIR", help="write every presented frame to DIR")
+    parser.add_argument("--capture-format", choices=("raw", "png"), default="raw",
+                        help="one raw RGB24 stream or a PNG per frame")
+    parser.add_argument("--capture-policy", choices=("drop", "block"), default="drop",
+                        help="when the writer falls behind, drop frames or wait for it")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help="frame rate to draw at; the game itself always steps at %(default)s per second")
+    parser.add_argument("--fixed-rate", action="store_true",
+                        help="always run at the full frame rate, even when nothing is moving")
+    parser.add_argument("--latency", metavar="PATH",
+                        help="measure key press to display latency per action and write it to PATH (.json or .csv) on exit")
+    args = parser.parse_args()
+    
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    
+    main(dirty_rendering=args.dirty_rects, stats_path=args.frame_stats, seed=args.seed,
+         record_path=args.record, replay_path=args.replay, max_speed=args.headless,
+         autoplay=args.autoplay, save_path=args.save, capture_path=args.capture,
+         capture_format=args.capture_format, capture_policy=args.capture_policy,
+         latency_path=args.latency, adaptive_pacing=not args.fixed_rate,
+         render_fps=args.fps)
\ No newline at end of file
@@ -0,0 +1,129 @@
+# Wavetable synthesizer for sound effects.
+# Waveforms are precomputed once into shared single-cycle tables, so a
+# voice is rendered with a table lookup instead of evaluating np.sin over
+# every sample. Voices get ADSR envelopes (no clicks at the start or end),
+# any number of them is rendered or mixed in one vectorized pass, and the
+# result is converted to whatever format the mixer actually opened with
+# (rate, sample type, mono or stereo).
+import functools
+
+import numpy as np
+import pygame
+from pygame import mixer
+
+# Samples per single-cycle table
+WAVETABLE_SIZE = 4096
+
+# Shared tables, indexed by waveform id
+WAVEFORMS = ["sine", "harmonic"]
+_phase = np.arange(WAVETABLE_SIZE) * (2 * np.pi / WAVETABLE_SIZE)
+WAVETABLES = np.stack([
+    np.sin(_phase),
+    (np.sin(_phase) + 0.3 * np.sin(2 * _phase)) / 1.3,
+]).astype(np.float32)
+
+# Unit white noise, read from a different offset per voice
+NOISE_TABLE = np.random.default_rng(0).normal(0, 1, 1 << 16).astype(np.float32)
+
+# Mixer format assumed when the mixer isn't open
+DEFAULT_FORMAT = (44100, -16, 2)
+
+class Envelope:
+    # Attack, decay and release times in seconds; sustain is a level
+    def __init__(self, attack=0.005, decay=0.05, sustain=0.7, release=0.05):
+        self.attack = attack
+        self.decay = decay
+        self.sustain = sustain
+        self.release = release
+
+    def key(self):
+        return (self.attack, self.decay, self.sustain, self.release)
+
+DEFAULT_ENVELOPE = Envelope()
+
+@functools.lru_cache(maxsize=256)
+def envelope_curve(key, length, sample_rate):
+    # Envelope levels for a note of `length` samples; a note too short for
+    # the whole envelope shrinks attack, decay and release in proportion
+    attack, decay, sustain, release = (np.array(key) * [sample_rate, sample_rate, 1, sample_rate])
+    scale = min(1.0, length / max(attack + decay + release, 1))
+    attack, decay, release = attack * scale, decay * scale, release * scale
+    times = [0, attack, attack + decay, length - release, length]
+    levels = [0.0, 1.0, sustain, sustain, 0.0]
+    curve = np.interp(np.arange(length), times, levels).astype(np.float32)
+    curve.setflags(write=False)
+    return curve
+
+class Voice:
+    # One note: noise is the level of white noise added to the waveform
+    def __init__(self, frequency, duration=0.3, volume=0.5, waveform="sine", noise=0.0,
+                 envelope=DEFAULT_ENVELOPE, start=0.0):
+        self.frequency = frequency
+        self.duration = duration
+        self.volume = volume
+        self.waveform = WAVEFORMS.index(waveform)
+        self.noise = noise
+        self.envelope = envelope
+        self.start = start
+
+def mixer_format():
+    # (sample rate, size, channels) the mixer opened with
+    return mixer.get_init() or DEFAULT_FORMAT
+
+def render_voices(voices, sample_rate=None):
+    # One row of float32 samples per voice, all rendered together; rows are
+    # as long as the longest voice (including its start offset)
+    sample_rate = sample_rate or mixer_format()[0]
+    starts = np.array([int(voice.start * sample_rate) for voice in voices])
+    lengths = np.array([int(voice.duration * sample_rate) for voice in voices])
+    total = int((starts + lengths).max())
+    t = np.arange(total) - starts[:, None]
+
+    # Table positions in 16.16 fixed point; WAVETABLE_SIZE is a power of two
+    step = np.array([round(voice.frequency * WAVETABLE_SIZE / sample_rate * 65536) for voice in voices])
+    index = ((t * step[:, None]) >> 16) & (WAVETABLE_SIZE - 1)
+    index += np.array([voice.waveform * WAVETABLE_SIZE for voice in voices])[:, None]
+    samples = WAVETABLES.take(index)
+
+    noise = np.array([voice.noise for voice in voices], dtype=np.float32)[:, None]
+    if noise.any():
+        offsets = np.arange(len(voices))[:, None] * 7919
+        samples += NOISE_TABLE.take((t + offsets) & (len(NOISE_TABLE) - 1)) * noise
+        np.clip(samples, -1, 1, out=samples)
+
+    # The envelopes are zero outside each voice, which also silences it there
+    gains = np.zeros((len(voices), total), dtype=np.float32)
+    for row, (voice, start, length) in enumerate(zip(voices, starts, lengths)):
+        curve = envelope_curve(voice.envelope.key(), int(length), sample_rate)
+        np.multiply(curve, voice.volume, out=gains[row, start:start + length])
+    samples *= gains
+    return samples
+
+def mix(voices, sample_rate=None):
+    # All voices summed into one track
+    return render_voices(voices, sample_rate).sum(axis=0)
+
+def to_mixer_samples(samples, audio_format=None):
+    # Mono samples (float in [-1, 1], or int16) in the mixer's sample type,
+    # with one column per channel when it isn't mono
+    _, size, channels = audio_format or mixer_format()
+    if samples.dtype == np.int16:
+        samples = samples / 32768
+    samples = np.clip(samples, -1, 1)
+
+    bits = abs(size)
+    if bits == 32:
+        out = samples.astype(np.float32)
+    else:
+        peak = (1 << (bits - 1)) - 1
+        out = np.round(samples * peak)
+        if size > 0:
+            out += peak + 1
+        out = out.astype({8: np.int8, 16: np.int16}[bits] if size < 0 else {8: np.uint8, 16: np.uint16}[bits])
+
+    if channels > 1:
+        out = np.repeat(out[:, None], channels, axis=1)
+    return out
+
+def make_sound(samples):
+    return pygame.sndarray.make_sound(to_mixer_samples(samples))